@@ -1,22 +1,21 @@
 import asyncio
-import aiohttp
 import random
+from typing import Optional
+
+from game_io import CONSOLE, GameIO
+from rate_provider import RateProvider, default_provider
 
 class CurrencyRouletteGame():
 
-    def __init__(self, difficulty: int):
+    def __init__(self, difficulty: int, rates: Optional[RateProvider] = None, io: Optional[GameIO] = None):
         if not 1 <= difficulty <= 5:
             raise ValueError("difficulty must be between 1 and 5")
         self.difficulty = difficulty
+        self.rates = rates or default_provider()
+        self.io = io or CONSOLE
     
     async def get_usd_to_ils_rate(self) -> float:
-        url = "https://api.frankfurter.app/latest?from=USD&to=ILS"
-        timeout = aiohttp.ClientTimeout(total=10)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(url) as resp:
-                resp.raise_for_status()
-                data = await resp.json()
-                return float(data["rates"]["ILS"])
+        return await self.rates.get_rate("USD", "ILS")
 
     def get_money_interval(self, amount_usd: float, rate: float) -> tuple[float, float]:
         t = amount_usd * rate
@@ -26,25 +25,36 @@ class CurrencyRouletteGame():
     def get_guess_from_user(self, amount_usd: int) -> float:
         while True:
             try:
-                s = input(f"How many ILS is {amount_usd} USD? ")
+                s = self.io.input(f"How many ILS is {amount_usd} USD? ")
                 return float(s)
             except ValueError:
-                print("Please enter a valid number (you can use a decimal point).")
+                self.io.output("Please enter a valid number (you can use a decimal point).")
+
+    def compare_results(self, amount_usd: int, rate: float) -> bool:
+        low, high = self.get_money_interval(amount_usd, rate)
+        guess = self.get_guess_from_user(amount_usd)
+        return low <= guess <= high
                 
     async def play(self):
         usd_amount = random.randint(1, 100)
         try:
             rate = await self.get_usd_to_ils_rate()
         except Exception as e:
-            print(f"Could not fetch exchange rate: {e}")
+            self.io.output(f"Could not fetch exchange rate: {e}")
             return False
 
-        low, high = await self.get_money_interval(usd_amount, rate)
-        guess = self.get_guess_from_user(usd_amount)
-        won = low <= guess <= high
+        won = self.compare_results(usd_amount, rate)
         return won
 
 
+async def play_round(game: CurrencyRouletteGame) -> bool:
+    """Play one round in its own event loop (asyncio.run), closing the loop's HTTP session afterwards."""
+    try:
+        return await game.play()
+    finally:
+        await game.rates.close()
+
+
 if __name__ == "__main__":
     game = CurrencyRouletteGame(difficulty=3)
-    print(asyncio.run(game.play()))
\ No newline at end of file
+    print(asyncio.run(play_round(game)))
\ No newline at end of file
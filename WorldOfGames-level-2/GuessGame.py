@@ -1,11 +1,15 @@
 import random
+from typing import Optional
+
+from game_io import CONSOLE, GameIO
 
 
 class GuessGame():
     
-    def __init__(self, difficulty):
+    def __init__(self, difficulty, io: Optional[GameIO] = None):
         self.secret_number = 0
         self.difficulty = difficulty
+        self.io = io or CONSOLE
     
     def generate_number(self):
         self.secret_number = random.randint(1, self.difficulty)
@@ -13,13 +17,13 @@ class GuessGame():
     def get_guess_from_user(self):
          while True:
             try:
-                guess = int(input(f"Pick a number between 1 and {self.difficulty}: "))
+                guess = int(self.io.input(f"Pick a number between 1 and {self.difficulty}: "))
                 if 1 <= guess <= self.difficulty:
                     return guess
                 else:
-                    print(f"Please enter a number between 1 and {self.difficulty}.")
+                    self.io.output(f"Please enter a number between 1 and {self.difficulty}.")
             except ValueError:
-                print("That’s not a valid number. Try again.")
+                self.io.output("That’s not a valid number. Try again.")
     
     def compare_results(self):
         return self.secret_number == self.get_guess_from_user()
@@ -1,25 +1,18 @@
-
-from CurrencyRouletteGame import CurrencyRouletteGame
-from GuessGame import GuessGame
-from MemoryGame import MemoryGame
+import game_registry
 
 
 def welcome(name):
     return f"Hello {name} and welcome to the World of Games (WoG)\nHere you can find many cool games to play"
 
-def load_game():
+def load_game(name=None):
     result = False
     
     while True:
         try:
-            gameNumber = int(input("""Please choose a game to play:
-1. Memory Game - a sequence of numbers will appear for 1 second and you have to guess it back.
-2. Guess Game - guess a number and see if you chose like the computer.
-3. Currency Roulette - Currency Roulette - try and guess the value of a random amount of USD in ILS.
-"""))
-            if gameNumber < 1 or gameNumber > 3:
+            gameNumber = int(input("Please choose a game to play:\n" + game_registry.menu()))
+            if gameNumber not in game_registry.GAMES:
                 print("That’s not a valid number. Try again.\n")
-                print("Please enter a number between 1 and 3")
+                print(f"Please enter a number between 1 and {len(game_registry.GAMES)}")
             else:
                 break
         except ValueError:
@@ -35,22 +28,21 @@ def load_game():
         else:
             break
     
-    match gameNumber:
-        case 1:
-            m = MemoryGame(levelOfDifficulty)
-            result = m.play()
-        case 2:
-            g = GuessGame(levelOfDifficulty)
-            result = g.play()
-        case 3:
-            c = CurrencyRouletteGame(levelOfDifficulty)
-            result = c.play()
+    # Only the chosen game's module (and e.g. aiohttp for Currency Roulette) is imported.
+    result = game_registry.play(gameNumber, levelOfDifficulty)
     print("You won!" if result else "You lost!")
+    if name:
+        import sqlite3
+        from score_store import default_store
+        try:
+            default_store().record(name, gameNumber, levelOfDifficulty, result)
+        except (sqlite3.Error, OSError) as e:
+            print(f"Could not save your score: {e}")
             
 def main():
     name = input("\n\nWhat is your name? ")
     print(welcome(name))
-    load_game()
+    load_game(name)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
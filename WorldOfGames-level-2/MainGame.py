@@ -1,4 +1,4 @@
 from Live import load_game, welcome
 
 print(welcome("Guy"))
-load_game()
\ No newline at end of file
+load_game("Guy")
\ No newline at end of file
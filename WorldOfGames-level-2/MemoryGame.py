@@ -1,14 +1,14 @@
-from typing import List
-import os
+from typing import List, Optional
 import random
-import sys
-import time
+
+from game_io import CONSOLE, GameIO
 
 
 class MemoryGame():
 
-    def __init__(self, difficulty):
+    def __init__(self, difficulty, io: Optional[GameIO] = None):
         self.difficulty = difficulty
+        self.io = io or CONSOLE
         
     def generate_sequence(self):
         amount = self.difficulty
@@ -16,39 +16,39 @@ class MemoryGame():
     
     def _clear_screen(self) -> None:
         """Best-effort clear/hide output so the user can’t see the sequence."""
-        if sys.stdout.isatty():
-            os.system("cls" if os.name == "nt" else "clear")
-        else:
-            print("\n" * 50)
+        self.io.clear()
     
     def show_sequence_briefly(self, seconds: float = 0.7) -> None:
         """Show the generated sequence briefly, then hide it."""
-        print("Memorize this sequence:")
-        print(" ".join(map(str, self.numbers)))
-        time.sleep(seconds)
+        self.io.output("Memorize this sequence:")
+        self.io.output(" ".join(map(str, self.numbers)))
+        self.io.sleep(seconds)
         self._clear_screen()            
         
     def get_list_from_user(self):
         while True:
-            raw = input(f"Enter the {self.difficulty} numbers you remember, "
-                        "space-separated (order matters):\n").strip()
+            raw = self.io.input(f"Enter the {self.difficulty} numbers you remember, "
+                                "space-separated (order matters):\n").strip()
             parts = raw.split()
             if len(parts) != self.difficulty:
-                print(f"Please enter exactly {self.difficulty} numbers.")
+                self.io.output(f"Please enter exactly {self.difficulty} numbers.")
                 continue
             try:
                 guesses = [int(p) for p in parts]
                 return guesses
             except ValueError:
-                print("All entries must be integers. Try again.")
+                self.io.output("All entries must be integers. Try again.")
     
     def is_list_equal(self, a: List[int], b: List[int]) -> bool:
         return a == b
     
+    def compare_results(self) -> bool:
+        guesses = self.get_list_from_user()
+        return self.is_list_equal(guesses, self.numbers)
+    
     def play(self):
         self.generate_sequence()
         self.show_sequence_briefly(0.7)
-        guesses = self.get_list_from_user()
-        won = self.is_list_equal(guesses, self.numbers)
+        won = self.compare_results()
         return won
     
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""Score store with millions of recorded games.
+
+Bulk-imports --games synthetic results for --players players into a fresh
+database, then times single recorded rounds, reopening the store, and the
+top-10 leaderboard from the in-memory index vs. from SQL over
+player_stats vs. rescanning the whole games history.
+
+    python bench_scores.py                      # 10M games
+    python bench_scores.py --games 1000000 --players 50000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from score_store import ScoreStore
+
+
+def synthetic_games(count: int, players: int, seed: int):
+    rng = random.Random(seed)
+    r = rng.random
+    names = [f"player{p}" for p in range(players)]
+    skill = [r() for _ in range(players)]
+    start = time.time() - 365 * 86400
+    step = 365 * 86400 / count
+    for i in range(count):
+        p = int(r() * players)
+        yield (names[p], 1 + int(r() * 3), 1 + int(r() * 5), int(r() < skill[p]), start + i * step)
+
+
+def timed(func, repeat: int = 1) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main(args) -> dict:
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-scores-"), "scores.db")
+    store = ScoreStore(path)
+
+    import_seconds, imported = timed(lambda: store.bulk_import(synthetic_games(args.games, args.players, args.seed)))
+
+    record_latencies = []
+    for i in range(args.records):
+        start = time.perf_counter()
+        store.record(f"player{i % args.players}", 2, 3, i % 2 == 0)
+        record_latencies.append(time.perf_counter() - start)
+    record_latencies.sort()
+
+    index_seconds, top = timed(lambda: store.top(10), repeat=1000)
+    stats_seconds, _ = timed(lambda: store.conn.execute(
+        "SELECT player, won, played FROM player_stats ORDER BY won DESC, played, player LIMIT 10").fetchall(), repeat=5)
+    history_seconds, history_top = timed(lambda: store.conn.execute(
+        "SELECT player, SUM(won) AS w, COUNT(*) AS n FROM games GROUP BY player ORDER BY w DESC, n, player LIMIT 10"
+    ).fetchall())
+    assert [row[0] for row in history_top] == [entry["player"] for entry in top]
+    store.close()
+
+    reopen_seconds, reopened = timed(lambda: ScoreStore(path))
+    reopened.close()
+
+    return {
+        "games": imported,
+        "players": args.players,
+        "db_size_mb": round(sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+                            / 2**20, 1),
+        "bulk_import_rows_per_second": round(imported / import_seconds),
+        "record_p50_ms": round(record_latencies[len(record_latencies) // 2] * 1000, 3),
+        "record_p99_ms": round(record_latencies[int(len(record_latencies) * 0.99)] * 1000, 3),
+        "top10_index_us": round(index_seconds * 1e6, 2),
+        "top10_player_stats_sql_ms": round(stats_seconds * 1000, 2),
+        "top10_history_rescan_ms": round(history_seconds * 1000, 1),
+        "reopen_ms": round(reopen_seconds * 1000, 1),
+        "top3": top[:3],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=10_000_000)
+    parser.add_argument("--players", type=int, default=100_000)
+    parser.add_argument("--records", type=int, default=2000, help="single rounds recorded after the import")
+    parser.add_argument("--seed", type=int, default=0)
+    print(json.dumps(main(parser.parse_args()), indent=2))
@@ -0,0 +1,90 @@
+"""Cold-start import time of MainGame.py, with a regression threshold.
+
+MainGame.py only imports Live before showing the menu, so this measures
+`python -X importtime -c "import Live"` in fresh interpreters. It also
+shows what each game costs once it is picked. It exits with status 1 if
+the median import time is above --max-ms, or if a game module or aiohttp
+is imported before a game is chosen.
+
+    python bench_startup.py
+    python bench_startup.py --runs 20 --max-ms 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import game_registry
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MUST_BE_LAZY = {entry.module for entry in game_registry.GAMES.values()} | {"aiohttp", "asyncio", "sqlite3"}
+
+
+def import_times(code: str) -> tuple:
+    """Run code in a fresh interpreter; return ({module: cumulative import us}, wall seconds)."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=HERE,
+                            capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules, wall
+
+
+def measure(code: str, module: str, runs: int) -> dict:
+    samples = [import_times(code) for _ in range(runs)]
+    return {
+        "median_ms": round(statistics.median(m.get(module, 0) for m, _ in samples) / 1000, 2),
+        "median_wall_ms": round(statistics.median(wall for _, wall in samples) * 1000, 1),
+        "modules": set(samples[-1][0]),
+    }
+
+
+def main(args) -> int:
+    import_times("import Live")  # write .pyc files first
+    baseline = measure("pass", "", args.runs)
+    startup = measure("import Live", "Live", args.runs)
+    eager = sorted(MUST_BE_LAZY & startup["modules"])
+
+    # Time game_registry.load() after Live is imported: what picking a game adds, not counting shared modules.
+    per_game = {}
+    for number, entry in game_registry.GAMES.items():
+        code = ("import time, Live, game_registry; start = time.perf_counter(); "
+                f"game_registry.load({number}); print(time.perf_counter() - start)")
+        samples = [float(subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True,
+                                        text=True, check=True).stdout) for _ in range(args.runs)]
+        per_game[entry.name] = {"import_ms_when_picked": round(statistics.median(samples) * 1000, 2)}
+
+    report = {
+        "runs": args.runs,
+        "python_startup_wall_ms": baseline["median_wall_ms"],
+        "maingame_import_ms": startup["median_ms"],
+        "maingame_startup_wall_ms": startup["median_wall_ms"],
+        "max_ms": args.max_ms,
+        "imported_before_menu": eager,
+        "games": per_game,
+    }
+    print(json.dumps(report, indent=2))
+
+    if eager:
+        print(f"FAIL: imported before a game was chosen: {', '.join(eager)}", file=sys.stderr)
+        return 1
+    if startup["median_ms"] > args.max_ms:
+        print(f"FAIL: import Live took {startup['median_ms']}ms (limit {args.max_ms}ms)", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=float(os.getenv("WOG_STARTUP_MAX_MS", 20)),
+                        help="fail above this median import time of Live")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,134 @@
+"""Simulated players: win rate per game/difficulty and CPU cost per round.
+
+Bots play the real game classes through BotIO, spread over a process
+pool. The Memory bot recalls each number with probability --recall, the
+Guess bot picks at random, and the Currency bot knows the (fixed) rate to
+within --currency-error. --fork-clear makes clear() run the `clear`
+command like the console used to, to show what that costs per round.
+
+    python bot_benchmark.py --rounds 200000
+    python bot_benchmark.py --rounds 2000 --fork-clear
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from CurrencyRouletteGame import CurrencyRouletteGame
+from GuessGame import GuessGame
+from MemoryGame import MemoryGame
+from game_io import GameIO
+from rate_provider import FixedRateBackend, RateProvider
+
+GAMES = {1: "memory", 2: "guess", 3: "currency"}
+RATE = 3.7
+
+
+class BotIO(GameIO):
+    """Answers prompts from what the game showed it."""
+
+    def __init__(self, rng: random.Random, recall: float, currency_error: float, fork_clear: bool = False):
+        self.rng = rng
+        self.recall = recall
+        self.currency_error = currency_error
+        self.fork_clear = fork_clear
+        self.last_output = ""
+
+    def input(self, prompt: str) -> str:
+        if prompt.startswith("Enter the"):
+            seen = self.last_output.split()
+            return " ".join(n if self.rng.random() < self.recall else str(self.rng.randint(1, 101)) for n in seen)
+        if prompt.startswith("Pick a number"):
+            difficulty = int(prompt.rstrip(": ").rsplit(" ", 1)[1])
+            return str(self.rng.randint(1, difficulty))
+        # "How many ILS is {amount} USD? "
+        amount = int(prompt.split()[4])
+        return str(amount * RATE * (1 + self.rng.gauss(0, self.currency_error)))
+
+    def output(self, text: str) -> None:
+        self.last_output = text
+
+    def sleep(self, seconds: float) -> None:
+        pass
+
+    def clear(self) -> None:
+        if self.fork_clear:
+            os.system("clear > /dev/null 2>&1")
+
+
+def play_chunk(game: int, difficulty: int, rounds: int, seed: int, recall: float,
+               currency_error: float, fork_clear: bool) -> tuple:
+    random.seed(seed)
+    io = BotIO(random.Random(seed + 1), recall, currency_error, fork_clear)
+    start = time.process_time()
+    if game == 3:
+        rates = RateProvider(backend=FixedRateBackend(RATE), ttl=float("inf"), cache_path="")
+
+        async def play_all():
+            won = 0
+            for _ in range(rounds):
+                won += await CurrencyRouletteGame(difficulty, rates=rates, io=io).play()
+            await rates.close()
+            return won
+
+        wins = asyncio.run(play_all())
+    else:
+        game_class = MemoryGame if game == 1 else GuessGame
+        wins = sum(game_class(difficulty, io=io).play() for _ in range(rounds))
+    return game, difficulty, rounds, wins, time.process_time() - start
+
+
+def main(args) -> dict:
+    games = [int(g) for g in args.games.split(",")]
+    jobs = []
+    seed = args.seed
+    for game in games:
+        for difficulty in range(1, 6):
+            for offset in range(0, args.rounds, args.chunk_size):
+                jobs.append((game, difficulty, min(args.chunk_size, args.rounds - offset), seed,
+                             args.recall, args.currency_error, args.fork_clear))
+                seed += 2
+
+    totals = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for game, difficulty, rounds, wins, cpu in pool.map(play_chunk, *zip(*jobs)):
+            entry = totals.setdefault((game, difficulty), [0, 0, 0.0])
+            entry[0] += rounds
+            entry[1] += wins
+            entry[2] += cpu
+    elapsed = time.perf_counter() - start
+
+    all_rounds = sum(rounds for rounds, _, _ in totals.values())
+    return {
+        "workers": args.workers,
+        "rounds": all_rounds,
+        "seconds": round(elapsed, 2),
+        "rounds_per_minute": round(all_rounds / elapsed * 60),
+        "results": [
+            {
+                "game": GAMES[game],
+                "difficulty": difficulty,
+                "rounds": rounds,
+                "win_rate": round(wins / rounds, 4),
+                "cpu_us_per_round": round(cpu / rounds * 1e6, 2),
+            }
+            for (game, difficulty), (rounds, wins, cpu) in sorted(totals.items())
+        ],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=100000, help="rounds per game and difficulty")
+    parser.add_argument("--games", default="1,2,3")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=20000, help="rounds per pool task")
+    parser.add_argument("--recall", type=float, default=0.9, help="memory bot: chance to recall each number")
+    parser.add_argument("--currency-error", type=float, default=0.02, help="currency bot: relative error of its estimate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fork-clear", action="store_true", help="clear the screen with the `clear` command")
+    print(json.dumps(main(parser.parse_args()), indent=2))
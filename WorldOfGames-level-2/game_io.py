@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+
+
+class GameIO():
+    """Everything a game needs from the outside world: reading answers, showing text, waiting, clearing.
+
+    Games default to ConsoleIO; bots, servers and benchmarks pass their own.
+    """
+
+    def input(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def output(self, text: str) -> None:
+        raise NotImplementedError
+
+    def sleep(self, seconds: float) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class ConsoleIO(GameIO):
+
+    def input(self, prompt: str) -> str:
+        return input(prompt)
+
+    def output(self, text: str) -> None:
+        print(text)
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+    def clear(self) -> None:
+        """Best-effort clear/hide output so the user can't see what was shown."""
+        if not sys.stdout.isatty():
+            print("\n" * 50)
+        elif os.name == "nt":
+            os.system("cls")
+        else:
+            # ANSI clear screen + cursor home, instead of forking `clear`.
+            sys.stdout.write("\033[2J\033[H")
+            sys.stdout.flush()
+
+
+CONSOLE = ConsoleIO()
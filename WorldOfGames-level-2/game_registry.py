@@ -0,0 +1,41 @@
+"""The games WoG offers, imported only when one is picked.
+
+Adding a game means adding an entry here; nothing else imports game
+modules up front. A game class takes the difficulty and has play(). If
+play() is a coroutine, the module also provides play_round(game), which
+is run with asyncio.run.
+
+This module is on the startup path, so it avoids importing typing.
+"""
+import importlib
+from collections import namedtuple
+
+GameEntry = namedtuple("GameEntry", "name description module class_name is_async", defaults=(False,))
+
+
+GAMES = {
+    1: GameEntry("Memory Game", "a sequence of numbers will appear for 1 second and you have to guess it back.",
+                 "MemoryGame", "MemoryGame"),
+    2: GameEntry("Guess Game", "guess a number and see if you chose like the computer.",
+                 "GuessGame", "GuessGame"),
+    3: GameEntry("Currency Roulette", "Currency Roulette - try and guess the value of a random amount of USD in ILS.",
+                 "CurrencyRouletteGame", "CurrencyRouletteGame", is_async=True),
+}
+
+
+def menu() -> str:
+    return "".join(f"{number}. {entry.name} - {entry.description}\n" for number, entry in GAMES.items())
+
+
+def load(number: int) -> type:
+    entry = GAMES[number]
+    return getattr(importlib.import_module(entry.module), entry.class_name)
+
+
+def play(number: int, difficulty: int) -> bool:
+    entry = GAMES[number]
+    game = load(number)(difficulty)
+    if entry.is_async:
+        import asyncio
+        return asyncio.run(importlib.import_module(entry.module).play_round(game))
+    return game.play()
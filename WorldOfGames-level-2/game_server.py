@@ -0,0 +1,352 @@
+"""Headless World of Games server: many players in one process.
+
+Each player gets a session, a small state machine:
+
+    start(game, difficulty) -> AWAITING_GUESS --guess--> ROUND_OVER --next--> AWAITING_GUESS
+
+The rules are the game classes' own: each session holds one game object
+and the server drives it through TurnIO, a GameIO that hands the game the
+player's message and stops it when it asks for more. Sessions idle longer
+than SESSION_IDLE_TIMEOUT seconds are evicted, unless a WebSocket is still
+connected to them.
+
+HTTP:
+    POST   /sessions               {"game": 1-3, "difficulty": 1-5}
+    POST   /sessions/{id}/guess    {"guess": ...}
+    POST   /sessions/{id}/next
+    DELETE /sessions/{id}
+    GET    /stats
+WebSocket /ws: send {"action": "start"|"guess"|"next", ...} with the same
+fields; the session lives as long as the connection.
+
+    python game_server.py            # listens on PORT (default 8080)
+"""
+import asyncio
+import os
+import random
+import secrets
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from aiohttp import WSMsgType, web
+
+from CurrencyRouletteGame import CurrencyRouletteGame
+from GuessGame import GuessGame
+from MemoryGame import MemoryGame
+from game_io import GameIO
+from rate_provider import RateProvider, default_provider
+
+MEMORY_GAME, GUESS_GAME, CURRENCY_ROULETTE = 1, 2, 3
+GAME_NAMES = {MEMORY_GAME: "Memory Game", GUESS_GAME: "Guess Game", CURRENCY_ROULETTE: "Currency Roulette"}
+AWAITING_GUESS, ROUND_OVER = "awaiting_guess", "round_over"
+
+IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", 300))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", 100000))
+
+
+class GameError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class AwaitingInput(Exception):
+    pass
+
+
+class TurnIO(GameIO):
+    """Runs one step of a game with at most one answer from the player.
+
+    When the game asks for input it wasn't given, input() keeps the prompt
+    and raises AwaitingInput, which ends the step. Games run synchronously
+    on the event loop, so one instance serves every session.
+    """
+
+    def __init__(self):
+        self.answer = None
+        self.prompt = ""
+        self.lines = []
+
+    def run(self, step: Callable, answer: Optional[str] = None):
+        """Return (result, waiting): waiting is True if step() asked for more input."""
+        self.answer, self.prompt, self.lines = answer, "", []
+        try:
+            return step(), False
+        except AwaitingInput:
+            return None, True
+
+    def input(self, prompt: str) -> str:
+        if self.answer is None:
+            self.prompt = prompt.strip()
+            raise AwaitingInput()
+        answer, self.answer = self.answer, None
+        return answer
+
+    def output(self, text: str) -> None:
+        self.lines.append(text)
+
+    def sleep(self, seconds: float) -> None:
+        pass
+
+    def clear(self) -> None:
+        # Hiding the sequence is up to the client.
+        pass
+
+
+class Session():
+    __slots__ = ("id", "game", "difficulty", "state", "player", "amount", "rate", "last_seen", "rounds", "wins",
+                 "attached", "lock")
+
+    def __init__(self, session_id: str, game: int, difficulty: int, player, attached: bool = False):
+        self.id = session_id
+        self.game = game
+        self.difficulty = difficulty
+        self.state = ROUND_OVER
+        self.player = player  # the MemoryGame, GuessGame or CurrencyRouletteGame being played
+        self.amount = 0       # CurrencyRoulette: USD amount and rate of the round
+        self.rate = 0.0
+        self.last_seen = time.monotonic()
+        self.rounds = 0
+        self.wins = 0
+        self.attached = attached  # a WebSocket owns it and ends it on disconnect
+        self.lock = asyncio.Lock()  # one round start at a time
+
+
+class GameServer():
+    """Sessions and game rules, independent of the transport."""
+
+    def __init__(self, rates: Optional[RateProvider] = None, idle_timeout: float = IDLE_TIMEOUT,
+                 max_sessions: int = MAX_SESSIONS):
+        self.rates = rates or default_provider()
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()  # least recently used first
+        self.io = TurnIO()
+        self.evicted = 0
+        self.rounds = 0
+        self.wins = 0
+
+    async def start(self, game, difficulty, attached: bool = False) -> dict:
+        if game not in GAME_NAMES:
+            raise GameError("game must be 1, 2 or 3")
+        if not isinstance(difficulty, int) or not 1 <= difficulty <= 5:
+            raise GameError("difficulty must be between 1 and 5")
+        if len(self.sessions) >= self.max_sessions:
+            self.evict_idle()
+            if len(self.sessions) >= self.max_sessions:
+                raise GameError("Too many sessions, try again later", status=503)
+        if game == MEMORY_GAME:
+            player = MemoryGame(difficulty, io=self.io)
+        elif game == GUESS_GAME:
+            player = GuessGame(difficulty, io=self.io)
+        else:
+            player = CurrencyRouletteGame(difficulty, rates=self.rates, io=self.io)
+        session = Session(secrets.token_urlsafe(12), game, difficulty, player, attached)
+        self.sessions[session.id] = session
+        try:
+            return await self.next_round(session.id)
+        except GameError:
+            # Eviction may already have dropped it while the rate was fetched.
+            self.sessions.pop(session.id, None)
+            raise
+
+    def get(self, session_id: str) -> Session:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise GameError("Unknown or expired session", status=404)
+        session.last_seen = time.monotonic()
+        self.sessions.move_to_end(session_id)
+        return session
+
+    async def next_round(self, session_id: str) -> dict:
+        session = self.get(session_id)
+        # The rate fetch awaits, so without this two /next calls could both pass the state check.
+        async with session.lock:
+            if session.state != ROUND_OVER:
+                raise GameError("Finish the current round first", status=409)
+            reply = {"session_id": session.id, "game": GAME_NAMES[session.game]}
+            player = session.player
+
+            # Start the round, then run the game up to its question to get the prompt.
+            if session.game == MEMORY_GAME:
+                player.generate_sequence()
+                self.io.run(player.show_sequence_briefly)
+                reply["sequence"] = player.numbers
+                self.io.run(player.get_list_from_user)
+            elif session.game == GUESS_GAME:
+                player.generate_number()
+                self.io.run(player.get_guess_from_user)
+            else:
+                try:
+                    rate = await player.get_usd_to_ils_rate()
+                except Exception as e:
+                    raise GameError(f"Could not fetch exchange rate: {e}", status=503)
+                session.amount = random.randint(1, 100)
+                session.rate = rate
+                self.io.run(lambda: player.get_guess_from_user(session.amount))
+            reply["prompt"] = self.io.prompt
+
+            session.state = AWAITING_GUESS
+            reply["state"] = session.state
+        return reply
+
+    def guess(self, session_id: str, guess) -> dict:
+        session = self.get(session_id)
+        if session.state != AWAITING_GUESS:
+            raise GameError("No round in progress, ask for the next one", status=409)
+
+        player = session.player
+        if isinstance(guess, list):
+            guess = " ".join(map(str, guess))
+        elif not isinstance(guess, str):
+            guess = "" if guess is None else str(guess)
+
+        if session.game == MEMORY_GAME:
+            won, rejected = self.io.run(player.compare_results, guess)
+            answer = player.numbers
+        elif session.game == GUESS_GAME:
+            won, rejected = self.io.run(player.compare_results, guess)
+            answer = player.secret_number
+        else:
+            won, rejected = self.io.run(lambda: player.compare_results(session.amount, session.rate), guess)
+            answer = list(player.get_money_interval(session.amount, session.rate))
+        if rejected:
+            # The game said why and asked again; the round stays open.
+            raise GameError(self.io.lines[-1] if self.io.lines else "Invalid guess")
+
+        session.state = ROUND_OVER
+        session.rounds += 1
+        session.wins += won
+        self.rounds += 1
+        self.wins += won
+        return {"session_id": session.id, "won": won, "answer": answer, "state": session.state,
+                "rounds": session.rounds, "wins": session.wins}
+
+    def end(self, session_id: str) -> None:
+        self.sessions.pop(session_id, None)
+
+    def evict_idle(self) -> int:
+        now = time.monotonic()
+        deadline = now - self.idle_timeout
+        evicted = 0
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if session.last_seen > deadline:
+                break
+            if session.attached:
+                # A connected WebSocket counts as activity; the handler ends the session on disconnect.
+                session.last_seen = now
+                self.sessions.move_to_end(session.id)
+                continue
+            self.sessions.popitem(last=False)
+            evicted += 1
+        self.evicted += evicted
+        return evicted
+
+    def stats(self) -> dict:
+        return {"sessions": len(self.sessions), "evicted": self.evicted, "rounds": self.rounds, "wins": self.wins}
+
+
+def create_app(server: Optional[GameServer] = None) -> web.Application:
+    server = server or GameServer()
+    app = web.Application()
+    app["server"] = server
+
+    async def read_json(request):
+        if not request.can_read_body:
+            return {}
+        try:
+            body = await request.json()
+        except ValueError:
+            raise GameError("Body must be JSON")
+        if not isinstance(body, dict):
+            raise GameError("Body must be a JSON object")
+        return body
+
+    @web.middleware
+    async def game_errors(request, handler):
+        try:
+            return await handler(request)
+        except GameError as e:
+            return web.json_response({"error": str(e)}, status=e.status)
+
+    async def create_session(request):
+        body = await read_json(request)
+        return web.json_response(await server.start(body.get("game"), body.get("difficulty")), status=201)
+
+    async def guess(request):
+        body = await read_json(request)
+        return web.json_response(server.guess(request.match_info["session_id"], body.get("guess")))
+
+    async def next_round(request):
+        return web.json_response(await server.next_round(request.match_info["session_id"]))
+
+    async def end_session(request):
+        server.end(request.match_info["session_id"])
+        return web.Response(status=204)
+
+    async def stats(request):
+        return web.json_response(server.stats())
+
+    async def websocket(request):
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        session_id = None
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    try:
+                        data = msg.json()
+                    except ValueError:
+                        raise GameError("Messages must be JSON")
+                    if not isinstance(data, dict):
+                        raise GameError("Messages must be JSON objects")
+                    action = data.get("action")
+                    if action == "start":
+                        if session_id is not None:
+                            server.end(session_id)
+                        reply = await server.start(data.get("game"), data.get("difficulty"), attached=True)
+                        session_id = reply["session_id"]
+                    elif session_id is None:
+                        raise GameError("Send a start action first", status=409)
+                    elif action == "guess":
+                        reply = server.guess(session_id, data.get("guess"))
+                    elif action == "next":
+                        reply = await server.next_round(session_id)
+                    else:
+                        raise GameError("action must be start, guess or next")
+                except GameError as e:
+                    reply = {"error": str(e), "status": e.status}
+                await ws.send_json(reply)
+        finally:
+            if session_id is not None:
+                server.end(session_id)
+        return ws
+
+    async def evict_periodically():
+        while True:
+            await asyncio.sleep(max(1.0, server.idle_timeout / 10))
+            server.evict_idle()
+
+    async def background(app):
+        task = asyncio.create_task(evict_periodically())
+        yield
+        task.cancel()
+        await server.rates.close()
+
+    app.middlewares.append(game_errors)
+    app.cleanup_ctx.append(background)
+    app.router.add_post("/sessions", create_session)
+    app.router.add_post("/sessions/{session_id}/guess", guess)
+    app.router.add_post("/sessions/{session_id}/next", next_round)
+    app.router.add_delete("/sessions/{session_id}", end_session)
+    app.router.add_get("/stats", stats)
+    app.router.add_get("/ws", websocket)
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), host=os.getenv("HOST", "0.0.0.0"), port=int(os.getenv("PORT", 8080)))
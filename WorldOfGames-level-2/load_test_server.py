@@ -0,0 +1,197 @@
+"""Load test for game_server.py: many concurrent bot players.
+
+By default the server runs in this process on a random local port, with a
+fixed exchange rate instead of frankfurter.app. --url targets a running
+server instead. Every player opens a session, keeps it open until all
+players are connected, then plays --rounds rounds. In-process, client and
+server share one event loop and CPU, and latency includes waiting for one of
+the --connections pooled HTTP connections.
+
+    python load_test_server.py --sessions 5000 --rounds 20
+    python load_test_server.py --transport ws --sessions 2000
+    python load_test_server.py --url http://localhost:8080
+"""
+import argparse
+import asyncio
+import json
+import random
+import resource
+import time
+import tracemalloc
+
+import aiohttp
+from aiohttp import web
+
+from game_server import GameServer, create_app
+from rate_provider import FixedRateBackend, RateProvider
+
+RATE = 3.7
+
+
+def bot_guess(reply: dict, game: int):
+    if game == 1:
+        return reply["sequence"]
+    if game == 2:
+        return random.randint(1, int(reply["prompt"].rstrip(":").rsplit(" ", 1)[1]))  # "Pick a number between 1 and {d}:"
+    amount = int(reply["prompt"].split()[4])  # "How many ILS is {amount} USD?"
+    return amount * RATE
+
+
+class HttpPlayer():
+    def __init__(self, client: aiohttp.ClientSession, url: str):
+        self.client = client
+        self.url = url
+        self.session_id = None
+
+    async def call(self, method, path, body=None):
+        async with self.client.request(method, self.url + path, json=body) as resp:
+            data = await resp.json() if resp.status != 204 else None
+            if resp.status >= 400:
+                raise RuntimeError(f"{resp.status} {data}")
+            return data
+
+    async def start(self, game, difficulty):
+        reply = await self.call("POST", "/sessions", {"game": game, "difficulty": difficulty})
+        self.session_id = reply["session_id"]
+        return reply
+
+    async def guess(self, guess):
+        return await self.call("POST", f"/sessions/{self.session_id}/guess", {"guess": guess})
+
+    async def next(self):
+        return await self.call("POST", f"/sessions/{self.session_id}/next")
+
+    async def close(self):
+        await self.call("DELETE", f"/sessions/{self.session_id}")
+
+
+class WsPlayer():
+    def __init__(self, client: aiohttp.ClientSession, url: str):
+        self.client = client
+        self.url = url
+        self.ws = None
+
+    async def call(self, message):
+        await self.ws.send_json(message)
+        reply = await self.ws.receive_json()
+        if "error" in reply:
+            raise RuntimeError(reply)
+        return reply
+
+    async def start(self, game, difficulty):
+        self.ws = await self.client.ws_connect(self.url + "/ws")
+        return await self.call({"action": "start", "game": game, "difficulty": difficulty})
+
+    async def guess(self, guess):
+        return await self.call({"action": "guess", "guess": guess})
+
+    async def next(self):
+        return await self.call({"action": "next"})
+
+    async def close(self):
+        await self.ws.close()
+
+
+async def run(url: str, args) -> dict:
+    latencies = []
+    errors = 0
+    all_started = asyncio.Event()
+    started = 0
+    games = [int(g) for g in args.games.split(",")]
+
+    async def timed(coro):
+        start = time.perf_counter()
+        result = await coro
+        latencies.append(time.perf_counter() - start)
+        return result
+
+    async def player(client, index):
+        nonlocal started, errors
+        game = games[index % len(games)]
+        p = (WsPlayer if args.transport == "ws" else HttpPlayer)(client, url)
+        try:
+            reply = await timed(p.start(game, random.randint(1, 5)))
+        except Exception:
+            errors += 1
+            reply = None
+        started += 1
+        if started == args.sessions:
+            all_started.set()
+        await all_started.wait()
+        if reply is None:
+            return
+        try:
+            for round_number in range(args.rounds):
+                await timed(p.guess(bot_guess(reply, game)))
+                if round_number + 1 < args.rounds:
+                    reply = await timed(p.next())
+            await p.close()
+        except Exception:
+            errors += 1
+
+    # Every WebSocket holds its connection for the whole run, so don't cap those.
+    connector = aiohttp.TCPConnector(limit=0 if args.transport == "ws" else args.connections)
+    async with aiohttp.ClientSession(connector=connector) as client:
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(player(client, i)) for i in range(args.sessions)]
+        await all_started.wait()
+        async with client.get(url + "/stats") as resp:
+            open_sessions = (await resp.json())["sessions"]
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "transport": args.transport,
+        "sessions": args.sessions,
+        "open_sessions_at_peak": open_sessions,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+    }
+
+
+async def session_footprint(count: int = 10000) -> int:
+    """Bytes allocated per open session, measured on a bare GameServer."""
+    server = GameServer(rates=RateProvider(backend=FixedRateBackend(RATE), cache_path=""))
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for i in range(count):
+        await server.start(1 + i % 3, 1 + i % 5)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    await server.rates.close()
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename")) // count
+
+
+async def main(args) -> dict:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    if args.url:
+        return await run(args.url.rstrip("/"), args)
+
+    server = GameServer(rates=RateProvider(backend=FixedRateBackend(RATE), cache_path=""))
+    runner = web.AppRunner(create_app(server))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0, backlog=4096)
+    await site.start()
+    port = runner.addresses[0][1]
+    try:
+        report = await run(f"http://127.0.0.1:{port}", args)
+    finally:
+        await runner.cleanup()
+    report["bytes_per_session"] = await session_footprint()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="test a running server instead of an in-process one")
+    parser.add_argument("--transport", choices=("http", "ws"), default="http")
+    parser.add_argument("--sessions", type=int, default=2000, help="concurrent players")
+    parser.add_argument("--rounds", type=int, default=10, help="rounds per player")
+    parser.add_argument("--games", default="1,2,3", help="comma-separated game numbers to play")
+    parser.add_argument("--connections", type=int, default=100, help="HTTP connection pool size")
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+
+
+class RateBackend():
+    """Where exchange rates come from. Subclass and override fetch_rate."""
+
+    async def fetch_rate(self, session: aiohttp.ClientSession, base: str, quote: str) -> float:
+        raise NotImplementedError
+
+
+class FrankfurterBackend(RateBackend):
+    """frankfurter.app, or anything serving the same /latest API (e.g. a local stub via RATE_API_URL)."""
+
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = (base_url or os.getenv("RATE_API_URL", "https://api.frankfurter.app")).rstrip("/")
+
+    async def fetch_rate(self, session: aiohttp.ClientSession, base: str, quote: str) -> float:
+        async with session.get(f"{self.base_url}/latest", params={"from": base, "to": quote}) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+            return float(data["rates"][quote])
+
+
+class FixedRateBackend(RateBackend):
+    """Always the same rate, without network access (offline play, bots, load tests)."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+
+    async def fetch_rate(self, session: aiohttp.ClientSession, base: str, quote: str) -> float:
+        return self.rate
+
+
+class RateProvider():
+    """Cached exchange rates.
+
+    Rates are kept in memory and in a JSON file so they survive restarts.
+    A rate younger than `ttl` seconds is returned as is. Up to `stale_ttl`
+    seconds past that it is still returned, while a background request
+    refreshes it (stale-while-revalidate). Older or missing rates are
+    fetched before returning; if that fails, any cached rate is used.
+
+    One aiohttp session is kept per event loop, so connections and DNS
+    lookups are reused across rounds.
+    """
+
+    def __init__(self, backend: Optional[RateBackend] = None, ttl: Optional[float] = None,
+                 stale_ttl: Optional[float] = None, cache_path: Optional[str] = None,
+                 timeout: float = 10):
+        self.backend = backend or FrankfurterBackend()
+        self.ttl = float(os.getenv("RATE_CACHE_TTL", 3600)) if ttl is None else ttl
+        self.stale_ttl = float(os.getenv("RATE_STALE_TTL", 86400)) if stale_ttl is None else stale_ttl
+        if cache_path is None:
+            cache_path = os.getenv("RATE_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "wog", "rates.json"))
+        self.cache_path = cache_path  # "" disables the disk cache
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._rates: Optional[Dict[str, Tuple[float, float]]] = None  # "USD:ILS" -> (rate, fetched_at)
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    async def get_rate(self, base: str = "USD", quote: str = "ILS") -> float:
+        key = f"{base}:{quote}"
+        cached = self._cache().get(key)
+        if cached is not None:
+            rate, fetched_at = cached
+            age = time.time() - fetched_at
+            if age < self.ttl:
+                return rate
+            if age < self.ttl + self.stale_ttl:
+                if key not in self._refreshing:
+                    task = asyncio.get_running_loop().create_task(self._refresh(key, base, quote))
+                    self._refreshing[key] = task
+                    task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+                return rate
+        try:
+            return await self._fetch(key, base, quote)
+        except Exception:
+            if cached is not None:
+                return cached[0]
+            raise
+
+    async def _refresh(self, key: str, base: str, quote: str) -> None:
+        try:
+            await self._fetch(key, base, quote)
+        except Exception as e:
+            print(f"Could not refresh exchange rate {key}: {e}")
+
+    async def _fetch(self, key: str, base: str, quote: str) -> float:
+        rate = await self.backend.fetch_rate(self._session(), base, quote)
+        self._cache()[key] = (rate, time.time())
+        self._save()
+        return rate
+
+    def _session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            # Sessions are bound to their loop; drop ones left behind by finished loops.
+            self._sessions = {l: s for l, s in self._sessions.items() if not l.is_closed()}
+            session = aiohttp.ClientSession(timeout=self.timeout)
+            self._sessions[loop] = session
+        return session
+
+    def _cache(self) -> Dict[str, Tuple[float, float]]:
+        if self._rates is None:
+            self._rates = {}
+            if self.cache_path:
+                try:
+                    with open(self.cache_path) as f:
+                        for key, entry in json.load(f).items():
+                            self._rates[key] = (float(entry["rate"]), float(entry["fetched_at"]))
+                except (OSError, ValueError, KeyError, TypeError):
+                    pass
+        return self._rates
+
+    def _save(self) -> None:
+        if not self.cache_path:
+            return
+        data = {key: {"rate": rate, "fetched_at": fetched_at} for key, (rate, fetched_at) in self._rates.items()}
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            print(f"Could not write rate cache {self.cache_path}: {e}")
+
+    async def close(self, refresh_grace: float = 2.0) -> None:
+        """Let background refreshes finish (up to refresh_grace seconds), then close this loop's session."""
+        loop = asyncio.get_running_loop()
+        pending = [t for t in self._refreshing.values() if t.get_loop() is loop]
+        if pending:
+            done, not_done = await asyncio.wait(pending, timeout=refresh_grace)
+            for task in not_done:
+                task.cancel()
+        session = self._sessions.pop(loop, None)
+        if session is not None:
+            await session.close()
+
+
+_default_provider: Optional[RateProvider] = None
+
+
+def default_provider() -> RateProvider:
+    global _default_provider
+    if _default_provider is None:
+        _default_provider = RateProvider()
+    return _default_provider
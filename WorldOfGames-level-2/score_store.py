@@ -0,0 +1,214 @@
+"""Game results and leaderboards.
+
+Every finished round is appended to the `games` table of a SQLite database
+in WAL mode, so a crash loses at most the round being written and never
+corrupts earlier ones. Per-player totals live in `player_stats` and are
+updated in the same transaction, so nothing ever rescans the history.
+The leaderboard is an in-memory sorted index over those totals, loaded
+once when the store opens and kept current on every write made through
+this store.
+
+    python score_store.py top [-k 10]
+    python score_store.py player NAME
+    python score_store.py import results.csv   # player,game,difficulty,won[,played_at]
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import time
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_PATH = os.getenv("WOG_SCORE_DB", os.path.join(os.path.expanduser("~"), ".local", "share", "wog", "scores.db"))
+IMPORT_BATCH = 100_000
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS games (
+        id INTEGER PRIMARY KEY,
+        player TEXT NOT NULL,
+        game INTEGER NOT NULL,
+        difficulty INTEGER NOT NULL,
+        won INTEGER NOT NULL,
+        played_at REAL NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS player_stats (
+        player TEXT PRIMARY KEY,
+        played INTEGER NOT NULL,
+        won INTEGER NOT NULL,
+        last_played REAL NOT NULL
+    ) WITHOUT ROWID""",
+    """CREATE TRIGGER IF NOT EXISTS games_no_update BEFORE UPDATE ON games
+       BEGIN SELECT RAISE(ABORT, 'games is append-only'); END""",
+    """CREATE TRIGGER IF NOT EXISTS games_no_delete BEFORE DELETE ON games
+       BEGIN SELECT RAISE(ABORT, 'games is append-only'); END""",
+]
+
+UPSERT_STATS = """
+    INSERT INTO player_stats (player, played, won, last_played) VALUES (?, ?, ?, ?)
+    ON CONFLICT(player) DO UPDATE SET
+        played = played + excluded.played,
+        won = won + excluded.won,
+        last_played = max(last_played, excluded.last_played)
+"""
+
+
+class Leaderboard():
+    """Players sorted by wins (then fewer games played, then name)."""
+
+    def __init__(self):
+        self._keys: List[Tuple[int, int, str]] = []   # (-won, played, player), ascending
+        self._by_player: Dict[str, Tuple[int, int, str]] = {}
+
+    def load(self, rows: Iterable[Tuple[str, int, int]]) -> None:
+        self._by_player = {player: (-won, played, player) for player, played, won in rows}
+        self._keys = sorted(self._by_player.values())
+
+    def update(self, player: str, played: int, won: int) -> None:
+        old = self._by_player.get(player)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, old)]
+        key = (-won, played, player)
+        insort(self._keys, key)
+        self._by_player[player] = key
+
+    def top(self, k: int = 10) -> List[dict]:
+        return [{"rank": i + 1, "player": player, "won": -won, "played": played}
+                for i, (won, played, player) in enumerate(self._keys[:k])]
+
+    def rank(self, player: str) -> Optional[int]:
+        key = self._by_player.get(player)
+        return None if key is None else bisect_left(self._keys, key) + 1
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class ScoreStore():
+
+    def __init__(self, path: str = DEFAULT_PATH, synchronous: str = os.getenv("WOG_SCORE_SYNC", "NORMAL")):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL: a power cut may drop the last commits but never corrupts the file; FULL fsyncs each round.
+        self.conn.execute(f"PRAGMA synchronous={synchronous}")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        for statement in SCHEMA:
+            self.conn.execute(statement)
+        self.leaderboard = Leaderboard()
+        self.leaderboard.load(self.conn.execute("SELECT player, played, won FROM player_stats"))
+
+    def record(self, player: str, game: int, difficulty: int, won: bool, played_at: Optional[float] = None) -> None:
+        played_at = time.time() if played_at is None else played_at
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute("INSERT INTO games (player, game, difficulty, won, played_at) VALUES (?, ?, ?, ?, ?)",
+                              (player, game, difficulty, int(won), played_at))
+            played, total_won = self.conn.execute(UPSERT_STATS + " RETURNING played, won",
+                                                  (player, 1, int(won), played_at)).fetchone()
+        self.leaderboard.update(player, played, total_won)
+
+    def bulk_import(self, rows: Iterable[tuple], batch_size: int = IMPORT_BATCH) -> int:
+        """Append many (player, game, difficulty, won[, played_at]) rows; one transaction per batch."""
+        imported = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                imported += self._import_batch(batch)
+                batch = []
+        if batch:
+            imported += self._import_batch(batch)
+        return imported
+
+    def _import_batch(self, batch: List[tuple]) -> int:
+        now = time.time()
+        games = []
+        deltas: Dict[str, List[float]] = {}
+        for row in batch:
+            player, game, difficulty, won = row[0], int(row[1]), int(row[2]), int(row[3])
+            played_at = float(row[4]) if len(row) > 4 else now
+            games.append((player, game, difficulty, won, played_at))
+            delta = deltas.get(player)
+            if delta is None:
+                deltas[player] = [1, won, played_at]
+            else:
+                delta[0] += 1
+                delta[1] += won
+                delta[2] = max(delta[2], played_at)
+
+        players = list(deltas)
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany("INSERT INTO games (player, game, difficulty, won, played_at) VALUES (?, ?, ?, ?, ?)",
+                                  games)
+            self.conn.executemany(UPSERT_STATS, ((p, d[0], d[1], d[2]) for p, d in deltas.items()))
+            totals = []
+            for start in range(0, len(players), 500):
+                chunk = players[start:start + 500]
+                totals += self.conn.execute(
+                    f"SELECT player, played, won FROM player_stats WHERE player IN ({', '.join('?' * len(chunk))})",
+                    chunk).fetchall()
+        if len(totals) > len(self.leaderboard) // 4:
+            self.leaderboard.load(self.conn.execute("SELECT player, played, won FROM player_stats"))
+        else:
+            for player, played, won in totals:
+                self.leaderboard.update(player, played, won)
+        return len(games)
+
+    def top(self, k: int = 10) -> List[dict]:
+        return self.leaderboard.top(k)
+
+    def player(self, name: str) -> Optional[dict]:
+        row = self.conn.execute("SELECT played, won, last_played FROM player_stats WHERE player = ?",
+                                (name,)).fetchone()
+        if row is None:
+            return None
+        played, won, last_played = row
+        return {"player": name, "played": played, "won": won, "win_rate": won / played,
+                "last_played": last_played, "rank": self.leaderboard.rank(name)}
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+_default_store: Optional[ScoreStore] = None
+
+
+def default_store() -> ScoreStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = ScoreStore()
+    return _default_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="World of Games scores")
+    parser.add_argument("--db", default=DEFAULT_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    top = commands.add_parser("top", help="show the leaderboard")
+    top.add_argument("-k", type=int, default=10)
+    player = commands.add_parser("player", help="show one player's totals")
+    player.add_argument("name")
+    import_csv = commands.add_parser("import", help="bulk-import results from a CSV file")
+    import_csv.add_argument("file")
+    args = parser.parse_args()
+
+    store = ScoreStore(args.db)
+    if args.command == "top":
+        for entry in store.top(args.k):
+            print(f"{entry['rank']:>4}. {entry['player']:<20} {entry['won']:>8} won / {entry['played']} played")
+    elif args.command == "player":
+        stats = store.player(args.name)
+        print(stats if stats is not None else f"No games recorded for {args.name}")
+    else:
+        with open(args.file, newline="") as f:
+            rows = (row for row in csv.reader(f) if row and row[0] != "player")
+            print(f"Imported {store.bulk_import(rows)} games")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
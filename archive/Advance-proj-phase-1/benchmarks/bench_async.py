@@ -0,0 +1,84 @@
+"""Concurrent throughput of blocking vs. threadpool-offloaded database calls.
+
+Simulates N in-flight requests against the MySQL configured in .env. The
+"blocking" mode calls pymysql directly inside the coroutine, the way the
+handlers used to; the "offload" mode goes through AsyncDatabase.run.
+
+    python benchmarks/bench_async.py --requests 500 --concurrency 50 --query-delay 0.01
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from db_connector import AsyncDatabase, Database  # noqa: E402
+
+
+def slow_query(conn, delay: float):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT SLEEP(%s)", (delay,))
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+async def run_blocking(db: Database, delay: float):
+    conn = db.get_connection()
+    try:
+        return slow_query(conn, delay)
+    finally:
+        db.release_connection(conn)
+
+
+async def run_offload(adb: AsyncDatabase, delay: float):
+    return await adb.run(slow_query, delay)
+
+
+async def drive(make_call, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await make_call()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return time.perf_counter() - start
+
+
+async def main(args):
+    db = Database()
+    db.start()
+    adb = AsyncDatabase(db)
+    try:
+        results = {}
+        for mode, make_call in (
+            ("blocking", lambda: run_blocking(db, args.query_delay)),
+            ("offload", lambda: run_offload(adb, args.query_delay)),
+        ):
+            elapsed = await drive(make_call, args.requests, args.concurrency)
+            results[mode] = {
+                "requests": args.requests,
+                "seconds": round(elapsed, 3),
+                "requests_per_second": round(args.requests / elapsed, 1),
+            }
+        results["speedup"] = round(
+            results["offload"]["requests_per_second"] / results["blocking"]["requests_per_second"], 2
+        )
+        print(json.dumps(results, indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--query-delay", type=float, default=0.01,
+                        help="seconds each simulated query spends in MySQL")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,98 @@
+"""Sync cost of polling GET /users vs. following /users/changes.
+
+Seeds --users users on the SQLite stand-in, lets a consumer catch up, then
+applies --changes updates and deletes. It then measures what each consumer
+does to pick them up. Re-polling GET /users reads every page again.
+Following the feed reads only what changed since the consumer's token.
+
+    python benchmarks/bench_change_feed.py --users 100000 --changes 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("FEED_SAFETY_LAG", "0")
+
+import rest_app  # noqa: E402
+from db_connector import AsyncDatabase  # noqa: E402
+from sqlite_backend import SQLiteDatabase  # noqa: E402
+
+
+async def poll_all(client, page_size: int) -> tuple:
+    requests = received = 0
+    after_id = 0
+    while after_id is not None:
+        response = await client.get("/users", params={"after_id": after_id, "limit": page_size})
+        body = response.json()
+        requests += 1
+        received += len(response.content)
+        after_id = body["next_after_id"]
+    return requests, received
+
+
+async def follow_feed(client, token, page_size: int) -> tuple:
+    requests = received = changes = 0
+    while True:
+        params = {"limit": page_size, **({"since": token} if token else {})}
+        response = await client.get("/users/changes", params=params)
+        body = response.json()
+        requests += 1
+        received += len(response.content)
+        changes += len(body["changes"])
+        token = body["next"]
+        if not body["has_more"]:
+            return token, requests, received, changes
+
+
+async def timed(coro) -> tuple:
+    start = time.perf_counter()
+    result = await coro
+    return time.perf_counter() - start, result
+
+
+async def main(args) -> dict:
+    rest_app.db = SQLiteDatabase()
+    rest_app.adb = AsyncDatabase(rest_app.db)
+    transport = httpx.ASGITransport(app=rest_app.app)
+    async with rest_app.lifespan(rest_app.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for start in range(0, args.users, 10000):
+                names = [{"user_name": f"user{i}"} for i in range(start, min(start + 10000, args.users))]
+                await client.post("/users:batch", json={"users": names}, params={"chunk_size": 1000})
+            await asyncio.sleep(1.1)   # timestamps have one-second resolution
+            token, *_ = await follow_feed(client, None, args.page_size)
+
+            for i in range(args.changes):
+                user_id = 1 + i * (args.users // args.changes)
+                if i % 4 == 0:
+                    await client.delete(f"/users/{user_id}")
+                else:
+                    await client.put(f"/users/{user_id}", json={"user_name": f"renamed{i}"})
+            await asyncio.sleep(1.1)
+
+            poll_seconds, (poll_requests, poll_bytes) = await timed(poll_all(client, args.page_size))
+            feed_seconds, (_, feed_requests, feed_bytes, seen) = await timed(
+                follow_feed(client, token, args.page_size))
+
+    return {
+        "users": args.users,
+        "changes": args.changes,
+        "poll_all": {"ms": round(poll_seconds * 1000, 1), "requests": poll_requests, "bytes": poll_bytes},
+        "change_feed": {"ms": round(feed_seconds * 1000, 1), "requests": feed_requests, "bytes": feed_bytes,
+                        "changes_seen": seen},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--changes", type=int, default=100)
+    parser.add_argument("--page-size", type=int, default=1000)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,85 @@
+"""Encoding cost of a page of users, old response path vs. new.
+
+"old" is what GET /users did before: tuple rows returned as a dict from the
+handler, run through jsonable_encoder and rendered by JSONResponse. "new"
+builds dict rows with users_repo.user_row and renders them with
+ORJSONResponse directly. The NDJSON export is compared the same way. No
+database is needed; rows are synthetic.
+
+    python benchmarks/bench_serialization.py --rows 10000 --repeat 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+
+import serialization  # noqa: E402
+from users_repo import user_row  # noqa: E402
+
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def synthetic_rows(count: int) -> list:
+    start = datetime(2024, 1, 1)
+    return [(i, f"user_{i}", start + timedelta(seconds=i), start + timedelta(seconds=2 * i))
+            for i in range(1, count + 1)]
+
+
+def old_page(rows):
+    return JSONResponse(jsonable_encoder({"users": rows, "next_after_id": rows[-1][0]})).body
+
+
+def new_page(rows):
+    users = list(map(user_row, rows))
+    return ORJSONResponse({"users": users, "next_after_id": users[-1]["id"]}).body
+
+
+def old_ndjson(rows):
+    return "".join(json.dumps(row, default=json_default) + "\n" for row in rows).encode()
+
+
+def new_ndjson(rows):
+    return serialization.dumps_lines(map(user_row, rows))
+
+
+def best_of(func, rows, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = func(rows)
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(body)
+
+
+def main(args) -> dict:
+    rows = synthetic_rows(args.rows)
+    results = {"rows": args.rows}
+    for name, old, new in (("page", old_page, new_page), ("ndjson", old_ndjson, new_ndjson)):
+        old_seconds, old_bytes = best_of(old, rows, args.repeat)
+        new_seconds, new_bytes = best_of(new, rows, args.repeat)
+        results[name] = {
+            "old_ms": round(old_seconds * 1000, 2),
+            "new_ms": round(new_seconds * 1000, 2),
+            "speedup": round(old_seconds / new_seconds, 1),
+            "old_bytes": old_bytes,
+            "new_bytes": new_bytes,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    print(json.dumps(main(parser.parse_args()), indent=2))
@@ -0,0 +1,124 @@
+"""Prefix search latency at scale: indexed SQL scan vs. the in-memory NameIndex.
+
+Fills the SQLite stand-in with --users users, then times
+users_repo.search_users (LIKE 'prefix%' range scan on the user_name
+index) and NameIndex.search on the same random 1-4 character prefixes.
+It also reports the index's build time from the change feed, its memory
+and the cost of applying one update.
+
+    python benchmarks/bench_user_search.py --users 1000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import users_repo  # noqa: E402
+from name_index import NameIndex  # noqa: E402
+from sqlite_backend import SQLiteDatabase  # noqa: E402
+
+SYLLABLES = ["al", "an", "ba", "be", "da", "el", "fi", "ga", "jo", "ka", "la", "li", "ma", "mi", "na", "no",
+             "ol", "pa", "ra", "ri", "sa", "sh", "ta", "to", "va", "yo", "za"]
+
+
+def synthetic_names(count: int, rng: random.Random):
+    for i in range(count):
+        name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        yield (f"{name.capitalize() if i % 3 == 0 else name}_{i}",)
+
+
+def build_index(conn) -> NameIndex:
+    """Fill a NameIndex from the change feed the way keep_warm does."""
+    index = NameIndex()
+    position, has_more = None, True
+    while has_more:
+        changes, position, has_more = users_repo.get_changes(conn, position, 10000, 0)
+        index.apply(changes)
+    index.mark_ready()
+    return index
+
+
+def percentiles(samples: list) -> dict:
+    samples = sorted(samples)
+    return {"p50_us": round(samples[len(samples) // 2] * 1e6, 1),
+            "p99_us": round(samples[int(len(samples) * 0.99)] * 1e6, 1)}
+
+
+def time_searches(search, prefixes: list, limit: int) -> tuple:
+    latencies = []
+    found = 0
+    for prefix in prefixes:
+        start = time.perf_counter()
+        found += len(search(prefix, limit))
+        latencies.append(time.perf_counter() - start)
+    return percentiles(latencies), found
+
+
+def main(args) -> dict:
+    rng = random.Random(args.seed)
+    db = SQLiteDatabase()
+    db.initialize_database()
+    conn = db.connect()
+    start = time.perf_counter()
+    conn._conn.executemany("INSERT INTO users (user_name) VALUES (?)", synthetic_names(args.users, rng))
+    # Back-date so the change feed (and its safety lag) sees every row.
+    conn._conn.execute("UPDATE users SET updated_at = datetime(CURRENT_TIMESTAMP, '-1 hour')")
+    conn.commit()
+    fill_seconds = time.perf_counter() - start
+
+    prefixes = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 2)))[:rng.randint(1, 4)]
+                for _ in range(args.searches)]
+
+    sql, sql_found = time_searches(lambda prefix, limit: users_repo.search_users(conn, prefix, limit),
+                                   prefixes, args.limit)
+
+    start = time.perf_counter()
+    index = build_index(conn)
+    build_seconds = time.perf_counter() - start
+    # A second build under tracemalloc, which would distort the timing above.
+    tracemalloc.start()
+    traced = build_index(conn)
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del traced
+
+    memory, memory_found = time_searches(index.search, prefixes, args.limit)
+    assert memory_found == sql_found, (memory_found, sql_found)
+
+    updates = []
+    for i in range(1000):
+        user_id = rng.randint(1, args.users)
+        change = {"op": "upsert", "id": user_id, "user": {"user_name": f"renamed_{i}"}}
+        start = time.perf_counter()
+        index.apply([change])
+        updates.append(time.perf_counter() - start)
+    conn.close()
+
+    return {
+        "users": args.users,
+        "fill_seconds": round(fill_seconds, 1),
+        "searches": args.searches,
+        "limit": args.limit,
+        "sql_like_range_scan": sql,
+        "name_index": {
+            **memory,
+            "build_from_feed_seconds": round(build_seconds, 1),
+            "memory_mb": round(index_bytes / 2**20, 1),
+            "update": percentiles(updates),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--searches", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    print(json.dumps(main(parser.parse_args()), indent=2))
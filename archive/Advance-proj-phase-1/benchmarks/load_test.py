@@ -0,0 +1,241 @@
+"""Load test for the users REST service.
+
+Drives every endpoint with a weighted request mix from concurrent clients
+and prints throughput, p50/p95/p99 latency and error rate as JSON. By default
+it runs rest_app in-process on the SQLite stand-in, so it needs neither MySQL
+nor a running server. Pass --url to load test a deployed instance instead.
+
+    python benchmarks/load_test.py --duration 30 --concurrency 32
+    python benchmarks/load_test.py --mix get_user=80,update_user=20 --output result.json
+    python benchmarks/load_test.py --url http://localhost:5000 --seed-users 0
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+DEFAULT_MIX = {
+    "get_user": 40,
+    "list_users": 15,
+    "create_user": 10,
+    "update_user": 10,
+    "delete_user": 5,
+    "create_batch": 4,
+    "update_batch": 4,
+    "delete_batch": 2,
+    "export_users": 1,
+    "metrics": 1,
+}
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown operation '{name}', expected one of {sorted(DEFAULT_MIX)}")
+        mix[name] = float(weight)
+    return mix
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def new_name() -> str:
+    return f"bench-{uuid.uuid4().hex[:16]}"
+
+
+class Workload:
+    """Issues requests and keeps track of user ids known to exist."""
+
+    def __init__(self, client: httpx.AsyncClient, batch_size: int, page_size: int):
+        self.client = client
+        self.batch_size = batch_size
+        self.page_size = page_size
+        self.user_ids = []
+
+    def _pick_id(self) -> int:
+        return random.choice(self.user_ids) if self.user_ids else 1
+
+    def _forget(self, user_id: int) -> None:
+        try:
+            self.user_ids.remove(user_id)
+        except ValueError:
+            pass
+
+    async def get_user(self):
+        return await self.client.get(f"/users/{self._pick_id()}")
+
+    async def list_users(self):
+        after_id = max(0, self._pick_id() - self.page_size)
+        return await self.client.get("/users", params={"after_id": after_id, "limit": self.page_size})
+
+    async def create_user(self):
+        response = await self.client.post("/users", json={"user_name": new_name()})
+        if response.status_code == 200 and response.json().get("user_id"):
+            self.user_ids.append(response.json()["user_id"])
+        return response
+
+    async def update_user(self):
+        return await self.client.put(f"/users/{self._pick_id()}", json={"user_name": new_name()})
+
+    async def delete_user(self):
+        user_id = self._pick_id()
+        self._forget(user_id)
+        return await self.client.delete(f"/users/{user_id}")
+
+    async def create_batch(self):
+        users = [{"user_name": new_name()} for _ in range(self.batch_size)]
+        response = await self.client.post("/users:batch", json={"users": users})
+        if response.status_code == 200:
+            self.user_ids.extend(r["user_id"] for r in response.json()["results"] if r["status"] == "created")
+        return response
+
+    async def update_batch(self):
+        ids = {self._pick_id() for _ in range(self.batch_size)}
+        users = [{"user_id": user_id, "user_name": new_name()} for user_id in ids]
+        return await self.client.put("/users:batch", json={"users": users})
+
+    async def delete_batch(self):
+        ids = list({self._pick_id() for _ in range(self.batch_size)})
+        for user_id in ids:
+            self._forget(user_id)
+        return await self.client.request("DELETE", "/users:batch", json={"user_ids": ids})
+
+    async def export_users(self):
+        async with self.client.stream("GET", "/users", params={"format": "ndjson"}) as response:
+            async for _ in response.aiter_bytes():
+                pass
+        return response
+
+    async def metrics(self):
+        return await self.client.get("/metrics")
+
+
+async def seed(workload: Workload, count: int) -> None:
+    batch = 1000
+    for start in range(0, count, batch):
+        users = [{"user_name": new_name()} for _ in range(min(batch, count - start))]
+        response = await workload.client.post("/users:batch", json={"users": users})
+        response.raise_for_status()
+        workload.user_ids.extend(r["user_id"] for r in response.json()["results"] if r["status"] == "created")
+
+
+async def run_load(workload: Workload, mix: dict, concurrency: int, duration: float, max_requests: int) -> dict:
+    operations = list(mix)
+    weights = [mix[op] for op in operations]
+    samples = {op: [] for op in operations}
+    errors = {op: 0 for op in operations}
+    issued = 0
+    deadline = time.perf_counter() + duration
+
+    async def client_loop():
+        nonlocal issued
+        while time.perf_counter() < deadline and (not max_requests or issued < max_requests):
+            issued += 1
+            op = random.choices(operations, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await getattr(workload, op)()
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            samples[op].append(time.perf_counter() - start)
+            if failed:
+                errors[op] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    def summarize(latencies: list, error_count: int) -> dict:
+        latencies = sorted(latencies)
+        count = len(latencies)
+        return {
+            "requests": count,
+            "errors": error_count,
+            "error_rate": round(error_count / count, 4) if count else 0.0,
+            "throughput_rps": round(count / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        }
+
+    all_latencies = [value for values in samples.values() for value in values]
+    return {
+        "duration_seconds": round(elapsed, 3),
+        "concurrency": concurrency,
+        "mix": mix,
+        "overall": summarize(all_latencies, sum(errors.values())),
+        "endpoints": {op: summarize(samples[op], errors[op]) for op in operations if samples[op]},
+    }
+
+
+@asynccontextmanager
+async def open_client(args):
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+            yield client, {"target": args.url}
+        return
+
+    os.environ.setdefault("USER_CACHE_BACKEND", args.cache)
+    os.environ["DB_POOL_MAX_SIZE"] = str(args.pool_size)
+    import rest_app
+    from db_connector import AsyncDatabase
+    from sqlite_backend import SQLiteDatabase
+
+    rest_app.db = SQLiteDatabase(args.sqlite_path)
+    rest_app.adb = AsyncDatabase(rest_app.db)
+    transport = httpx.ASGITransport(app=rest_app.app)
+    async with rest_app.lifespan(rest_app.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout) as client:
+            yield client, {"target": "in-process", "database": rest_app.db.path}
+
+
+async def main(args) -> dict:
+    random.seed(args.seed)
+    async with open_client(args) as (client, target):
+        workload = Workload(client, args.batch_size, args.page_size)
+        await seed(workload, args.seed_users)
+        result = await run_load(workload, args.mix, args.concurrency, args.duration, args.requests)
+    return {**target, "seed_users": args.seed_users, **result}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="base URL of a running rest_app; default runs in-process on SQLite")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0 = no limit)")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="comma-separated op=weight pairs, e.g. get_user=80,update_user=20")
+    parser.add_argument("--seed-users", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--cache", default="memory", help="USER_CACHE_BACKEND for in-process runs")
+    parser.add_argument("--pool-size", type=int, default=8, help="DB_POOL_MAX_SIZE for in-process runs")
+    parser.add_argument("--sqlite-path", help="SQLite file for in-process runs (default: a temp file)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the request mix")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
@@ -0,0 +1,169 @@
+"""SQLite stand-in for the MySQL Database, for benchmarks without a MySQL server.
+
+SQLiteDatabase is a drop-in Database: it keeps the same connection pool and
+hands out connections that accept the pymysql-style SQL used in users_repo
+(%s placeholders, NOW(), FOR UPDATE) and raise pymysql exceptions. It shows
+how the application code behaves, not how MySQL itself performs.
+"""
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pymysql
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from db_connector import Database  # noqa: E402
+import db_metrics  # noqa: E402
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        -- NOCASE: case-insensitive like the MySQL default, and lets LIKE 'x%' use the index
+        user_name VARCHAR(50) UNIQUE NOT NULL COLLATE NOCASE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_users_created_at ON users (created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_users_updated_at ON users (updated_at)",
+    """
+    CREATE TABLE IF NOT EXISTS user_tombstones (
+        user_id INTEGER NOT NULL,
+        deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (deleted_at, user_id)
+    ) WITHOUT ROWID
+    """,
+]
+
+_TRANSLATIONS = [
+    (re.compile(r"\bNOW\(\) - INTERVAL %s SECOND"), "datetime(CURRENT_TIMESTAMP, '-' || %s || ' seconds')"),
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\bNOW\(\)"), "CURRENT_TIMESTAMP"),
+    (re.compile(r"\s+FOR UPDATE\b"), ""),
+]
+
+sqlite3.register_converter("TIMESTAMP", lambda raw: datetime.fromisoformat(raw.decode()))
+
+
+def translate(sql: str, _cache={}) -> str:
+    translated = _cache.get(sql)
+    if translated is None:
+        translated = sql
+        for pattern, replacement in _TRANSLATIONS:
+            translated = pattern.sub(replacement, translated)
+        _cache[sql] = translated
+    return translated
+
+
+def _reraise(e: sqlite3.Error):
+    if isinstance(e, sqlite3.IntegrityError):
+        raise pymysql.err.IntegrityError(str(e)) from e
+    raise pymysql.err.OperationalError(str(e)) from e
+
+
+class SQLiteCursor:
+    def __init__(self, conn: sqlite3.Connection):
+        self._cursor = conn.cursor()
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self) -> int:
+        return self._cursor.lastrowid
+
+    # Timed through db_metrics like InstrumentedCursor, so in-process runs
+    # include the instrumentation overhead and fill the db_* metrics.
+    def execute(self, sql: str, args=()):
+        start = time.perf_counter()
+        try:
+            self._cursor.execute(translate(sql), tuple(args) if args is not None else ())
+        except sqlite3.Error as e:
+            db_metrics.observe(sql, time.perf_counter() - start, failed=True)
+            _reraise(e)
+        db_metrics.observe(sql, time.perf_counter() - start, self._cursor.rowcount)
+        return self._cursor.rowcount
+
+    def executemany(self, sql: str, args):
+        start = time.perf_counter()
+        try:
+            self._cursor.executemany(translate(sql), args)
+        except sqlite3.Error as e:
+            db_metrics.observe(sql, time.perf_counter() - start, failed=True)
+            _reraise(e)
+        db_metrics.observe(sql, time.perf_counter() - start, self._cursor.rowcount)
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size: int):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self) -> None:
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SQLiteConnection:
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False,
+                                     timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    def cursor(self, cursorclass=None) -> SQLiteCursor:
+        return SQLiteCursor(self._conn)
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def rollback(self) -> None:
+        self._conn.rollback()
+
+    def ping(self, reconnect: bool = False) -> None:
+        pass
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class SQLiteDatabase(Database):
+    def __init__(self, path: str = None):
+        super().__init__()
+        if path is None:
+            path = os.path.join(tempfile.mkdtemp(prefix="users-bench-"), "users.db")
+        self.path = path
+
+    def connect(self, **overrides) -> SQLiteConnection:
+        return SQLiteConnection(self.path)
+
+    def start(self, migrate=None) -> None:
+        # There are no migrations to check here; always create the schema.
+        self.initialize_database()
+        self.pool.open()
+
+    def initialize_database(self, *args, **kwargs) -> bool:
+        conn = self.connect()
+        try:
+            for statement in SCHEMA:
+                conn._conn.execute(statement)
+            conn.commit()
+            return True
+        finally:
+            conn.close()
@@ -0,0 +1,202 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Optional, Tuple
+from prometheus_client import Counter
+import serialization
+
+CACHE_HITS = Counter("user_cache_hits_total", "User cache hits", ["backend"])
+CACHE_MISSES = Counter("user_cache_misses_total", "User cache misses", ["backend"])
+CACHE_EVICTIONS = Counter("user_cache_evictions_total", "User cache evictions", ["backend", "reason"])
+
+
+# Read-through callers take a token() before loading a value and pass it to
+# set(). If the key was invalidated in between, the loaded value may predate
+# the write, so set() drops it instead of caching it for a whole TTL.
+
+
+class LRUCache:
+    """In-process LRU cache with a per-entry TTL.
+
+    Only touched from the event loop, so it needs no locking. Entries live in
+    one process; with several replicas keep the TTL short or use RedisCache.
+    """
+    backend = "memory"
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        # key -> when it was last invalidated, oldest first. Kept for one TTL:
+        # set() refuses tokens older than that anyway.
+        self._invalidated = OrderedDict()
+        self._hits = CACHE_HITS.labels(backend=self.backend)
+        self._misses = CACHE_MISSES.labels(backend=self.backend)
+        self._expired = CACHE_EVICTIONS.labels(backend=self.backend, reason="expired")
+        self._evicted = CACHE_EVICTIONS.labels(backend=self.backend, reason="size")
+
+    async def get(self, key) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._hits.inc()
+                return True, entry[1]
+            del self._entries[key]
+            self._expired.inc()
+        self._misses.inc()
+        return False, None
+
+    async def token(self, key) -> float:
+        return time.monotonic()
+
+    async def set(self, key, value, token: float) -> None:
+        now = time.monotonic()
+        self._forget_invalidations(now)
+        if now - token >= self.ttl or self._invalidated.get(key, float("-inf")) >= token:
+            return
+        self._entries[key] = (now + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._evicted.inc()
+
+    async def delete_many(self, keys: Iterable) -> None:
+        now = time.monotonic()
+        for key in keys:
+            self._entries.pop(key, None)
+            self._invalidated[key] = now
+            self._invalidated.move_to_end(key)
+        self._forget_invalidations(now)
+
+    def _forget_invalidations(self, now: float) -> None:
+        while self._invalidated:
+            key, invalidated_at = next(iter(self._invalidated.items()))
+            if now - invalidated_at < self.ttl:
+                break
+            del self._invalidated[key]
+
+    async def close(self) -> None:
+        self._entries.clear()
+        self._invalidated.clear()
+
+
+class RedisCache:
+    """Cache shared by all replicas. Size bounds come from Redis maxmemory.
+
+    Only hits and misses are counted here. Redis expires and evicts keys on
+    its own, and its INFO counters cover the whole server rather than this
+    prefix, so user_cache_evictions_total has no redis series; watch
+    expired_keys/evicted_keys in INFO stats instead.
+
+    Invalidating a key also stamps "<prefix>gen:<key>" with a fresh number
+    from "<prefix>gen". set() writes only if that stamp still matches the
+    token, checked and written in one script.
+    """
+    backend = "redis"
+
+    _SET = """
+    if (redis.call('get', KEYS[2]) or '') == ARGV[3] then
+        return redis.call('set', KEYS[1], ARGV[1], 'px', ARGV[2])
+    end
+    return false
+    """
+    _INVALIDATE = """
+    local generation = redis.call('incr', KEYS[1])
+    for i = 2, #KEYS, 2 do
+        redis.call('del', KEYS[i])
+        redis.call('set', KEYS[i + 1], generation, 'px', ARGV[1])
+    end
+    """
+
+    def __init__(self, host: str, port: int, ttl: float = 60.0, prefix: str = "users:"):
+        import redis.asyncio as redis
+
+        self.ttl = ttl
+        self.prefix = prefix
+        self._redis = redis.Redis(
+            host=host,
+            port=port,
+            max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", 20)),
+            socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", 0.5))
+        )
+        self._set = self._redis.register_script(self._SET)
+        self._invalidate = self._redis.register_script(self._INVALIDATE)
+        self._hits = CACHE_HITS.labels(backend=self.backend)
+        self._misses = CACHE_MISSES.labels(backend=self.backend)
+
+    async def get(self, key) -> Tuple[bool, Any]:
+        try:
+            raw = await self._redis.get(f"{self.prefix}{key}")
+        except Exception as e:
+            print(f"Cache read failed: {e}")
+            raw = None
+        if raw is None:
+            self._misses.inc()
+            return False, None
+        self._hits.inc()
+        return True, serialization.loads(raw)
+
+    async def token(self, key) -> Optional[Tuple[float, bytes]]:
+        try:
+            generation = await self._redis.get(f"{self.prefix}gen:{key}")
+        except Exception as e:
+            print(f"Cache read failed: {e}")
+            return None
+        return time.monotonic(), generation or b""
+
+    async def set(self, key, value, token: Optional[Tuple[float, bytes]]) -> None:
+        # Generation stamps expire after one TTL, so older tokens can't be checked.
+        if token is None or time.monotonic() - token[0] >= self.ttl:
+            return
+        try:
+            await self._set(keys=[f"{self.prefix}{key}", f"{self.prefix}gen:{key}"],
+                            args=[serialization.dumps(value), int(self.ttl * 1000), token[1]])
+        except Exception as e:
+            print(f"Cache write failed: {e}")
+
+    async def delete_many(self, keys: Iterable) -> None:
+        names = []
+        for key in keys:
+            names += [f"{self.prefix}{key}", f"{self.prefix}gen:{key}"]
+        if not names:
+            return
+        try:
+            await self._invalidate(keys=[f"{self.prefix}gen"] + names, args=[int(self.ttl * 1000)])
+        except Exception as e:
+            # The write is already committed; readers may see the old row until the TTL expires.
+            print(f"Cache invalidation failed: {e}")
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class NullCache:
+    backend = "none"
+
+    async def get(self, key) -> Tuple[bool, Any]:
+        return False, None
+
+    async def token(self, key) -> None:
+        return None
+
+    async def set(self, key, value, token) -> None:
+        pass
+
+    async def delete_many(self, keys: Iterable) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+def create_cache(backend: Optional[str] = None):
+    backend = (backend or os.getenv("USER_CACHE_BACKEND", "memory")).lower()
+    ttl = float(os.getenv("USER_CACHE_TTL", 60))
+    if backend == "memory":
+        return LRUCache(max_size=int(os.getenv("USER_CACHE_SIZE", 10000)), ttl=ttl)
+    if backend == "redis":
+        return RedisCache(os.getenv("REDIS_HOST", "localhost"), int(os.getenv("REDIS_PORT", 6379)), ttl=ttl)
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"Unknown USER_CACHE_BACKEND: {backend}")
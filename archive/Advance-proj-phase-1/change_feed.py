@@ -0,0 +1,58 @@
+"""Change feed tokens and local change notifications.
+
+A token is the feed position returned by users_repo.get_changes, encoded
+as opaque URL-safe text. Clients store it and pass it back as `since` (or
+as Last-Event-ID when reconnecting an event stream).
+"""
+import asyncio
+import base64
+from datetime import datetime
+from typing import Optional
+import serialization
+
+
+class InvalidTokenError(ValueError):
+    pass
+
+
+def encode_token(position: tuple) -> str:
+    users_at, users_id, deleted_at, deleted_id = position
+    raw = serialization.dumps([users_at, users_id, deleted_at, deleted_id])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_token(token: Optional[str]) -> Optional[tuple]:
+    if not token:
+        return None
+    try:
+        users_at, users_id, deleted_at, deleted_id = serialization.loads(
+            base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return (datetime.fromisoformat(users_at), int(users_id), datetime.fromisoformat(deleted_at), int(deleted_id))
+    except Exception:
+        raise InvalidTokenError(f"Invalid change feed token: {token!r}")
+
+
+class ChangeNotifier:
+    """Wakes event streams in this process when a write commits.
+
+    Writes through other processes or replicas are not seen here; streams
+    fall back to polling for those.
+    """
+
+    def __init__(self):
+        self._event: Optional[asyncio.Event] = None
+
+    def notify(self) -> None:
+        if self._event is not None:
+            self._event.set()
+            self._event = None
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for the next notify(); False on timeout."""
+        if self._event is None:
+            self._event = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
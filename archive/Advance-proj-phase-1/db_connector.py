@@ -1,42 +1,237 @@
+import anyio
 import pymysql
 import os
-from typing import Optional
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional
 from dotenv import load_dotenv
+import migrate
+import db_metrics
 
 load_dotenv()
 
 
+class PoolTimeoutError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of pymysql connections.
+
+    Idle connections are kept in a LIFO stack so the warmest ones are reused
+    first and the coldest ones age out through idle eviction. Every checkout
+    pings the connection, and connections older than max_lifetime are
+    recycled instead of handed out.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], pymysql.connections.Connection],
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 10.0,
+        idle_timeout: float = 300.0,
+        max_lifetime: float = 1800.0
+    ):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError("pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (conn, created_at, returned_at), newest on the right
+        self._created_at = {}
+        self._size = 0
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    def open(self) -> None:
+        """Pre-fill the pool up to min_size connections."""
+        while True:
+            with self._lock:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            conn = self._create()
+            self.release(conn)
+
+    def acquire(self, timeout: Optional[float] = None):
+        start = time.monotonic()
+        conn = self._acquire(self.timeout if timeout is None else timeout, start)
+        db_metrics.POOL_WAIT.observe(time.monotonic() - start)
+        return conn
+
+    def _acquire(self, timeout: float, start: float):
+        deadline = start + timeout
+
+        while True:
+            conn = None
+            with self._lock:
+                while True:
+                    if self._closed:
+                        raise Exception("Connection pool is closed")
+                    self._evict_idle()
+                    if self._idle:
+                        conn, created_at, _ = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        db_metrics.POOL_TIMEOUTS.inc()
+                        raise PoolTimeoutError(
+                            f"Timed out after {timeout}s waiting for a database connection "
+                            f"(max_size={self.max_size})"
+                        )
+                    self._lock.wait(remaining)
+
+            if conn is None:
+                return self._create()
+
+            if time.monotonic() - created_at >= self.max_lifetime:
+                self.discard(conn)
+                continue
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                self.discard(conn)
+                continue
+            return conn
+
+    def release(self, conn) -> None:
+        """Return a connection to the pool, rolling back any open transaction."""
+        try:
+            conn.rollback()
+        except Exception:
+            self.discard(conn)
+            return
+
+        with self._lock:
+            created_at = self._created_at.get(id(conn))
+            if self._closed or created_at is None:
+                self._drop(conn)
+                return
+            self._idle.append((conn, created_at, time.monotonic()))
+            self._lock.notify()
+
+    def discard(self, conn) -> None:
+        """Close a connection that must not go back to the pool."""
+        with self._lock:
+            self._drop(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                conn, _, _ = self._idle.popleft()
+                self._drop(conn)
+            self._lock.notify_all()
+
+    def _create(self):
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._created_at[id(conn)] = time.monotonic()
+        return conn
+
+    def _drop(self, conn) -> None:
+        # Caller holds self._lock.
+        if self._created_at.pop(id(conn), None) is not None:
+            self._size -= 1
+            self._lock.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _evict_idle(self) -> None:
+        # Caller holds self._lock. The oldest returns sit on the left.
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size:
+            conn, created_at, returned_at = self._idle[0]
+            if now - returned_at < self.idle_timeout and now - created_at < self.max_lifetime:
+                break
+            self._idle.popleft()
+            self._drop(conn)
+
+
 class Database:
     def __init__(self):
         self.config = {
             'host': os.getenv('DB_HOST', 'localhost'),
             'user': os.getenv('DB_USER', 'username'),
             'password': os.getenv('DB_PASSWORD', 'password'),
-            'database': os.getenv('DB_NAME', 'mydb')
+            'database': os.getenv('DB_NAME', 'mydb'),
+            'cursorclass': db_metrics.InstrumentedCursor
         }
         self.admin_connection = None
+        self.pool = ConnectionPool(
+            self.connect,
+            min_size=int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+            max_size=int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            timeout=float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            idle_timeout=float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300)),
+            max_lifetime=float(os.getenv('DB_POOL_MAX_LIFETIME', 1800))
+        )
 
-    def get_connection(self):
+    def connect(self, **overrides):
+        """Open a new connection outside the pool, e.g. for long-running streams."""
+        return pymysql.connect(**{**self.config, **overrides})
+
+    def start(self, migrate: Optional[bool] = None) -> None:
+        """Warm up the pool, first applying pending migrations if enabled. Call at application startup.
+
+        Migrations are off by default and belong to `python migrate.py` (e.g. an
+        init container). When enabled, the admin login only happens if the app
+        credentials see a pending migration.
+        """
+        if migrate is None:
+            migrate = os.getenv('DB_MIGRATE_ON_STARTUP', 'false').lower() == 'true'
+        if migrate and self.has_pending_migrations() and not self.initialize_database():
+            raise Exception("Critical: Unable to initialize the database")
+        self.pool.open()
+
+    def has_pending_migrations(self, migrations_dir: Optional[str] = None) -> bool:
+        """Check schema_migrations with the app credentials. Unknown counts as pending."""
         try:
-            conn = pymysql.connect(**self.config)
-            if conn is None:
-                raise Exception("Failed to establish database connection")
-                
-            with conn.cursor() as cursor:
-                cursor.execute("SHOW TABLES LIKE 'users'")
-                table_exists = cursor.fetchone()
-                if table_exists is not None:
-                    return conn
-            conn.close()
+            conn = self.connect()
         except Exception as e:
-            print(f"Database connection failed: {e}")
-        
-        self.initialize_database()
-        
-        final_conn = pymysql.connect(**self.config)
-        if final_conn is None:
-            raise Exception("Critical: Unable to establish database connection after initialization")
-        return final_conn
+            print(f"Could not check migration status: {e}")
+            return True
+        try:
+            return bool(migrate.pending_migrations(conn, migrations_dir or migrate.MIGRATIONS_DIR))
+        except Exception as e:
+            print(f"Could not check migration status: {e}")
+            return True
+        finally:
+            conn.close()
+
+    def get_connection(self):
+        return self.pool.acquire()
+
+    def release_connection(self, conn) -> None:
+        self.pool.release(conn)
+
+    def close(self) -> None:
+        self.pool.close()
 
     def connect_as_admin(self, admin_user: str = "root", admin_password: str = "") -> bool:
         try:
@@ -45,7 +240,7 @@ class Database:
                 user=admin_user,
                 password=admin_password,
                 charset='utf8mb4',
-                cursorclass=pymysql.cursors.DictCursor
+                cursorclass=db_metrics.InstrumentedDictCursor
             )
             return True
         except Exception as e:
@@ -69,49 +264,6 @@ class Database:
             print(f"Failed to create root user: {e}")
             return False
 
-    def create_database_schema(self, database_name: str, schema_file: Optional[str] = None) -> bool:
-        if not self.admin_connection:
-            print("Not connected as admin")
-            return False
-        
-        try:
-            with self.admin_connection.cursor() as cursor:
-                cursor.execute(f"CREATE DATABASE IF NOT EXISTS {database_name}")
-                cursor.execute(f"USE {database_name}")
-                
-                if schema_file and os.path.exists(schema_file):
-                    with open(schema_file, 'r') as f:
-                        schema_sql = f.read()
-                    
-                    for statement in schema_sql.split(';'):
-                        statement = statement.strip()
-                        if statement:
-                            cursor.execute(statement)
-                else:
-                    self._create_default_schema(cursor)
-                
-                self.admin_connection.commit()
-                print(f"Database '{database_name}' and schema created successfully")
-                return True
-        except Exception as e:
-            print(f"Failed to create database schema: {e}")
-            return False
-
-    def _create_default_schema(self, cursor) -> None:
-        tables = [
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_name VARCHAR(50) UNIQUE NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-            )
-            """
-        ]
-        
-        for table_sql in tables:
-            cursor.execute(table_sql)
-
     def initialize_database(
         self,
         admin_user: Optional[str] = None,
@@ -119,25 +271,27 @@ class Database:
         database_name: Optional[str] = None,
         new_root_user: Optional[str] = None,
         new_root_password: Optional[str] = None,
-        schema_file: Optional[str] = None
+        migrations_dir: Optional[str] = None
     ) -> bool:
         admin_user = admin_user or os.getenv('DB_ROOT_USER', 'root')
         admin_password = admin_password or os.getenv('DB_ROOT_PASSWORD', '')
-        database_name = database_name or os.getenv('DB_NAME', 'users_db')
-        
+        database_name = database_name or self.config['database']
+
         if not self.connect_as_admin(admin_user, admin_password):
             return False
-        
+
         try:
             if new_root_user and new_root_password:
                 if not self.create_root_user(new_root_user, new_root_password):
                     return False
-            
-            if not self.create_database_schema(database_name, schema_file):
-                return False
-            
-            print("Database initialization completed successfully")
+
+            applied = migrate.run_migrations(self.admin_connection, database_name,
+                                             migrations_dir or migrate.MIGRATIONS_DIR)
+            print(f"Database '{database_name}' is up to date ({len(applied)} migrations applied)")
             return True
+        except Exception as e:
+            print(f"Failed to migrate database schema: {e}")
+            return False
         finally:
             self.close_admin_connection()
 
@@ -145,4 +299,30 @@ class Database:
         if self.admin_connection:
             self.admin_connection.close()
             self.admin_connection = None
-    
+
+
+class AsyncDatabase:
+    """Async front end for Database used by the FastAPI handlers.
+
+    pymysql is blocking, so each call checks out a pooled connection and runs
+    on a worker thread. The thread limiter is sized to the pool so callers
+    queue on the event loop instead of parking threads on the pool lock.
+    """
+
+    def __init__(self, db: Database, max_workers: Optional[int] = None):
+        self.db = db
+        self.max_workers = max_workers or db.pool.max_size
+        self._limiter = None
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """Run func(conn, *args) on a worker thread with a pooled connection."""
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.max_workers)
+        return await anyio.to_thread.run_sync(self._run, func, *args, limiter=self._limiter)
+
+    def _run(self, func: Callable[..., Any], *args) -> Any:
+        conn = self.db.get_connection()
+        try:
+            return func(conn, *args)
+        finally:
+            self.db.release_connection(conn)
@@ -0,0 +1,104 @@
+"""Query timing, row counts and pool wait metrics for pymysql.
+
+Connections opened by Database use InstrumentedCursor, so every statement
+is timed without changes to users_repo. Statements are grouped by
+fingerprint: the SQL with literals and placeholders replaced by `?` and
+IN lists, multi-row VALUES and CASE branches collapsed, so a batch of 10
+and a batch of 500 land in the same series. Past DB_METRICS_MAX_QUERIES
+fingerprints, new ones are recorded under query="__overflow__".
+
+Statements slower than DB_SLOW_QUERY_MS are printed with their
+fingerprint, never with the parameter values.
+"""
+import os
+import re
+import time
+from functools import lru_cache
+from prometheus_client import Counter, Histogram
+import pymysql
+
+QUERY_LATENCY = Histogram("db_query_duration_seconds", "SQL statement latency", ["query"],
+                          buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+QUERY_ROWS = Counter("db_query_rows_total", "Rows returned or affected by SQL statements", ["query"])
+QUERY_ERRORS = Counter("db_query_errors_total", "SQL statements that raised", ["query"])
+SLOW_QUERIES = Counter("db_slow_queries_total", "SQL statements slower than DB_SLOW_QUERY_MS", ["query"])
+POOL_WAIT = Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection",
+                      buckets=(.0001, .0005, .001, .005, .01, .05, .1, .5, 1, 2.5, 5, 10))
+POOL_TIMEOUTS = Counter("db_pool_checkout_timeouts_total", "Connection checkouts that timed out")
+
+SLOW_QUERY_SECONDS = float(os.getenv("DB_SLOW_QUERY_MS", "500")) / 1000
+MAX_QUERIES = int(os.getenv("DB_METRICS_MAX_QUERIES", "200"))
+MAX_LABEL_LENGTH = 200
+OVERFLOW_QUERY = "__overflow__"
+
+_NORMALIZE = [
+    (re.compile(r"'(?:[^'\\]|\\.|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\s+"), " "),
+    (re.compile(r"\bIN \( ?\?(?: ?, ?\?)* ?\)", re.IGNORECASE), "IN (...)"),
+    (re.compile(r"\b(VALUES \([^)]*\))(?: ?, ?\([^)]*\))+", re.IGNORECASE), r"\1"),
+    (re.compile(r"(WHEN \? THEN \?)(?: WHEN \? THEN \?)+", re.IGNORECASE), r"\1"),
+]
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> str:
+    """Normalized SQL used as the `query` label, e.g. `SELECT id FROM users WHERE id IN (...)`."""
+    for pattern, replacement in _NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+_children = {}
+
+
+def _resolve(query: str):
+    children = _children.get(query)
+    if children is None:
+        label = OVERFLOW_QUERY if len(_children) >= MAX_QUERIES else query[:MAX_LABEL_LENGTH]
+        children = (QUERY_LATENCY.labels(query=label), QUERY_ROWS.labels(query=label),
+                    QUERY_ERRORS.labels(query=label), SLOW_QUERIES.labels(query=label))
+        if label != OVERFLOW_QUERY:
+            _children[query] = children
+    return children
+
+
+def observe(sql: str, elapsed: float, rows: int = 0, failed: bool = False) -> None:
+    """Record one statement. rows < 0 (unknown, e.g. unbuffered cursors) is not counted."""
+    query = fingerprint(sql)
+    latency, row_count, errors, slow = _resolve(query)
+    latency.observe(elapsed)
+    if failed:
+        errors.inc()
+    elif rows > 0:
+        row_count.inc(rows)
+    if elapsed >= SLOW_QUERY_SECONDS > 0:
+        slow.inc()
+        print(f"Slow query ({elapsed * 1000:.1f} ms, {rows if rows >= 0 else '?'} rows): {query}")
+
+
+class InstrumentedCursorMixin:
+    # pymysql's executemany goes through execute as well, once per round trip.
+    def execute(self, query, args=None):
+        start = time.perf_counter()
+        try:
+            result = super().execute(query, args)
+        except Exception:
+            observe(query, time.perf_counter() - start, failed=True)
+            raise
+        rows = self.rowcount
+        observe(query, time.perf_counter() - start, rows if rows < 2**63 else -1)
+        return result
+
+
+class InstrumentedCursor(InstrumentedCursorMixin, pymysql.cursors.Cursor):
+    pass
+
+
+class InstrumentedSSCursor(InstrumentedCursorMixin, pymysql.cursors.SSCursor):
+    """Unbuffered: only the time to the first result is measured and rows are not counted."""
+
+
+class InstrumentedDictCursor(InstrumentedCursorMixin, pymysql.cursors.DictCursor):
+    pass
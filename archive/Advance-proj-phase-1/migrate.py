@@ -0,0 +1,196 @@
+"""Versioned schema migrations for the users database.
+
+Migrations are SQL files named NNNN_description.sql in the migrations/
+directory. Each one is applied once, in version order, and recorded in the
+schema_migrations table. The runner is idempotent and takes a MySQL named
+lock, so several replicas starting together apply each migration only once.
+
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # list applied and pending migrations
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+from typing import List, NamedTuple, Optional
+from db_metrics import InstrumentedCursor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+LOCK_NAME = "users_schema_migrations"
+LOCK_TIMEOUT = int(os.getenv("DB_MIGRATION_LOCK_TIMEOUT", 60))
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    path: str
+    checksum: str
+
+
+def split_sql(sql: str) -> List[str]:
+    """Split a script into statements on semicolons outside quotes and comments."""
+    statements = []
+    current = []
+    i = 0
+    quote = None
+    while i < len(sql):
+        char = sql[i]
+        pair = sql[i:i + 2]
+        if quote:
+            current.append(char)
+            if char == "\\" and quote != "`" and i + 1 < len(sql):
+                current.append(sql[i + 1])
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in ("'", '"', "`"):
+            quote = char
+            current.append(char)
+        elif (pair == "--" and sql[i + 2:i + 3] in ("", " ", "\t", "\n", "\r")) or char == "#":
+            # MySQL only starts a -- comment when whitespace or the end follows, so 1--1 is 1 - (-1).
+            end = sql.find("\n", i)
+            i = len(sql) if end == -1 else end
+            continue
+        elif pair == "/*":
+            end = sql.find("*/", i + 2)
+            i = len(sql) if end == -1 else end + 2
+            current.append(" ")
+            continue
+        elif char == ";":
+            statement = "".join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+        else:
+            current.append(char)
+        i += 1
+
+    statement = "".join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def discover_migrations(migrations_dir: str = MIGRATIONS_DIR) -> List[Migration]:
+    migrations = []
+    for file_name in os.listdir(migrations_dir):
+        match = MIGRATION_FILE.match(file_name)
+        if not match:
+            continue
+        path = os.path.join(migrations_dir, file_name)
+        with open(path, "rb") as f:
+            checksum = hashlib.sha256(f.read()).hexdigest()
+        migrations.append(Migration(int(match.group(1)), match.group(2), path, checksum))
+
+    migrations.sort()
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise Exception(f"Duplicate migration versions in {migrations_dir}")
+    return migrations
+
+
+def _ensure_migrations_table(cursor) -> None:
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _applied_migrations(cursor) -> dict:
+    cursor.execute("SELECT version, checksum FROM schema_migrations")
+    return {version: checksum for version, checksum in cursor.fetchall()}
+
+
+def run_migrations(conn, database_name: str, migrations_dir: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Create the database if needed and apply pending migrations.
+
+    conn must be an admin connection allowed to create databases. Returns the
+    migrations applied by this call.
+    """
+    migrations = discover_migrations(migrations_dir)
+    applied_now = []
+    with conn.cursor(InstrumentedCursor) as cursor:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database_name}`")
+        cursor.execute(f"USE `{database_name}`")
+
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, LOCK_TIMEOUT))
+        if cursor.fetchone()[0] != 1:
+            raise Exception(f"Timed out waiting for migration lock '{LOCK_NAME}'")
+        try:
+            _ensure_migrations_table(cursor)
+            applied = _applied_migrations(cursor)
+            for migration in migrations:
+                if migration.version in applied:
+                    if applied[migration.version] != migration.checksum:
+                        print(f"Warning: migration {migration.version}_{migration.name} changed after it was applied")
+                    continue
+
+                print(f"Applying migration {migration.version}_{migration.name}")
+                with open(migration.path, "r") as f:
+                    for statement in split_sql(f.read()):
+                        cursor.execute(statement)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                    (migration.version, migration.name, migration.checksum)
+                )
+                conn.commit()
+                applied_now.append(migration)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+    return applied_now
+
+
+def migration_status(conn, database_name: str, migrations_dir: str = MIGRATIONS_DIR) -> List[tuple]:
+    """Return (migration, applied) pairs for every migration file."""
+    migrations = discover_migrations(migrations_dir)
+    with conn.cursor(InstrumentedCursor) as cursor:
+        cursor.execute("SHOW DATABASES LIKE %s", (database_name,))
+        if cursor.fetchone() is None:
+            return [(m, False) for m in migrations]
+        cursor.execute(f"USE `{database_name}`")
+        cursor.execute("SHOW TABLES LIKE 'schema_migrations'")
+        applied = _applied_migrations(cursor) if cursor.fetchone() else {}
+    return [(m, m.version in applied) for m in migrations]
+
+
+def pending_migrations(conn, migrations_dir: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Return migrations not yet applied to conn's current database. Needs no admin rights."""
+    with conn.cursor(InstrumentedCursor) as cursor:
+        cursor.execute("SHOW TABLES LIKE 'schema_migrations'")
+        applied = _applied_migrations(cursor) if cursor.fetchone() else {}
+    return [m for m in discover_migrations(migrations_dir) if m.version not in applied]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from db_connector import Database
+
+    parser = argparse.ArgumentParser(description="Apply database schema migrations")
+    parser.add_argument("--status", action="store_true", help="show migration status and exit")
+    parser.add_argument("--migrations-dir", default=MIGRATIONS_DIR)
+    args = parser.parse_args(argv)
+
+    db = Database()
+    if args.status:
+        if not db.connect_as_admin(os.getenv('DB_ROOT_USER', 'root'), os.getenv('DB_ROOT_PASSWORD', '')):
+            return 1
+        try:
+            for migration, applied in migration_status(db.admin_connection, db.config['database'], args.migrations_dir):
+                print(f"{'applied' if applied else 'pending':8} {migration.version:04d}_{migration.name}")
+        finally:
+            db.close_admin_connection()
+        return 0
+
+    return 0 if db.initialize_database(migrations_dir=args.migrations_dir) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+-- Time-range queries on created_at/updated_at otherwise scan the whole table.
+--
+-- MySQL has no CREATE INDEX IF NOT EXISTS, and DDL commits on its own, so each
+-- index is guarded: a run that failed after the first index can be retried.
+SET @sql = IF(
+    (SELECT COUNT(*) FROM information_schema.statistics
+     WHERE table_schema = DATABASE() AND table_name = 'users' AND index_name = 'idx_users_created_at') = 0,
+    'CREATE INDEX idx_users_created_at ON users (created_at)',
+    'DO 0'
+);
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @sql = IF(
+    (SELECT COUNT(*) FROM information_schema.statistics
+     WHERE table_schema = DATABASE() AND table_name = 'users' AND index_name = 'idx_users_updated_at') = 0,
+    'CREATE INDEX idx_users_updated_at ON users (updated_at)',
+    'DO 0'
+);
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
@@ -0,0 +1,11 @@
+-- Deleted users, for the change feed. Rows are written in the same
+-- transaction as the DELETE. The primary key doubles as the feed's scan
+-- order.
+--
+-- The feed scans users by (updated_at, id). idx_users_updated_at already
+-- serves that: InnoDB appends the primary key to every secondary index.
+CREATE TABLE IF NOT EXISTS user_tombstones (
+    user_id INT NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (deleted_at, user_id)
+);
@@ -0,0 +1,111 @@
+"""In-memory prefix index over user names, for autocomplete.
+
+Names are kept case-folded in one sorted list with a parallel list of ids,
+so a prefix search is a bisect plus a short forward walk. A sorted list
+takes far less memory than a trie with a node per character, and
+updates are a bisect plus one list insert.
+
+The index is filled and kept current from the change feed by keep_warm,
+so it trails the database by about FEED_SAFETY_LAG. Until the first full
+pass is done, `ready` is False and callers should query the database.
+"""
+import asyncio
+from bisect import bisect_left
+from typing import Dict, List
+import users_repo
+
+# Each update shifts both sorted lists (about 0.7 ms at 1M users), so big
+# pages are applied in chunks that yield to the event loop in between.
+APPLY_CHUNK = 50
+
+
+class NameIndex:
+
+    def __init__(self):
+        self._keys: List[str] = []   # case-folded names, sorted
+        self._ids: List[int] = []    # user id for each key
+        self._names: Dict[int, str] = {}
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def apply(self, changes: List[dict]) -> None:
+        """Apply change feed entries. Before mark_ready only the name map is updated."""
+        for change in changes:
+            user_id = change["id"]
+            if self.ready:
+                self._remove(user_id)
+            if change["op"] == "delete":
+                self._names.pop(user_id, None)
+                continue
+            user_name = change["user"]["user_name"]
+            self._names[user_id] = user_name
+            if self.ready:
+                key = _key(user_name)
+                index = bisect_left(self._keys, key)
+                self._keys.insert(index, key)
+                self._ids.insert(index, user_id)
+
+    def mark_ready(self) -> None:
+        """Sort everything loaded so far once and start serving searches."""
+        entries = sorted((_key(name), user_id) for user_id, name in self._names.items())
+        self._keys = [key for key, _ in entries]
+        self._ids = [user_id for _, user_id in entries]
+        self.ready = True
+
+    def search(self, prefix: str, limit: int) -> List[dict]:
+        prefix = _key(prefix)
+        keys = self._keys
+        index = bisect_left(keys, prefix)
+        end = min(index + limit, len(keys))
+        results = []
+        while index < end and keys[index].startswith(prefix):
+            user_id = self._ids[index]
+            results.append({"id": user_id, "user_name": self._names[user_id]})
+            index += 1
+        return results
+
+    def _remove(self, user_id: int) -> None:
+        name = self._names.get(user_id)
+        if name is None:
+            return
+        key = _key(name)
+        index = bisect_left(self._keys, key)
+        while self._ids[index] != user_id:
+            index += 1
+        del self._keys[index]
+        del self._ids[index]
+
+
+def _key(name: str) -> str:
+    key = name.casefold()
+    # Share the string when folding changes nothing, which is most names.
+    return name if key == name else key
+
+
+async def keep_warm(index: NameIndex, adb, notifier, lag: float, poll_interval: float,
+                    page_size: int = 10000) -> None:
+    """Load the index from the change feed, then follow the feed until cancelled."""
+    position = None
+    while True:
+        try:
+            changes, position, has_more = await adb.run(users_repo.get_changes, position, page_size, lag)
+        except Exception as e:
+            print(f"User search index sync failed: {e}")
+            await asyncio.sleep(poll_interval)
+            continue
+        if index.ready:
+            for start in range(0, len(changes), APPLY_CHUNK):
+                index.apply(changes[start:start + APPLY_CHUNK])
+                await asyncio.sleep(0)
+        else:
+            index.apply(changes)
+        if has_more:
+            continue
+        if not index.ready:
+            # Sorting a million names takes about half a second; searches use SQL meanwhile.
+            await asyncio.to_thread(index.mark_ready)
+            print(f"User search index ready ({len(index)} users)")
+        if await notifier.wait(poll_interval):
+            await asyncio.sleep(lag + 1)
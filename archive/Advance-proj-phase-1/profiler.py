@@ -0,0 +1,54 @@
+"""Sampling profiler for a live process.
+
+Samples the stack of every thread at a fixed interval and returns them in
+collapsed-stack format (`frame;frame;frame count` per line), which
+flamegraph.pl and speedscope read directly. Sampling only reads
+sys._current_frames(), so the process being profiled is not paused or
+traced; the cost is the sampler thread itself. Only one profile runs at a
+time.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+
+MAX_SECONDS = 60.0
+MIN_INTERVAL = 0.001
+
+_running = threading.Lock()
+
+
+class ProfilerBusyError(Exception):
+    pass
+
+
+def _stack(frame) -> str:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+def sample(seconds: float, interval: float = 0.005) -> str:
+    """Blocking: sample all threads for `seconds` and return collapsed stacks, most frequent first."""
+    seconds = min(max(seconds, 0.0), MAX_SECONDS)
+    interval = max(interval, MIN_INTERVAL)
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running")
+    try:
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    stacks[f"{names.get(ident, ident)};{_stack(frame)}"] += 1
+            time.sleep(interval)
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    finally:
+        _running.release()
@@ -1,90 +1,238 @@
 import os
-from fastapi import FastAPI, Depends
-from pydantic import BaseModel
+import asyncio
+from contextlib import asynccontextmanager
+import anyio
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 import uvicorn
-from db_connector import Database
-from typing import Optional
+from db_connector import AsyncDatabase, Database
+import users_repo
+import serialization
+import profiler
+from change_feed import ChangeNotifier, InvalidTokenError, decode_token, encode_token
+from name_index import NameIndex, keep_warm
+from cache import create_cache
+from typing import List, Literal, Optional
 from datetime import datetime
 
 load_dotenv()
 
 db = Database()
-
-def get_db():
-    connection = db.get_connection()
-    try:
-        yield connection
-    finally:
-        connection.close()
+adb = AsyncDatabase(db)
+user_cache = create_cache()
+change_notifier = ChangeNotifier()
+name_index = NameIndex()
 
 HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", 5000))
 RELOAD = os.getenv("RELOAD", "true").lower() == "true"
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", 100))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 1000))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", 500))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 50000))
+FEED_SAFETY_LAG = float(os.getenv("FEED_SAFETY_LAG", 2))
+FEED_POLL_INTERVAL = float(os.getenv("FEED_POLL_INTERVAL", 5))
+SEARCH_LIMIT = int(os.getenv("SEARCH_LIMIT", 10))
+USER_SEARCH_INDEX = os.getenv("USER_SEARCH_INDEX", "false").lower() == "true"
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db.start()
+    index_task = None
+    if USER_SEARCH_INDEX:
+        index_task = asyncio.create_task(
+            keep_warm(name_index, adb, change_notifier, FEED_SAFETY_LAG, FEED_POLL_INTERVAL))
+    try:
+        yield
+    finally:
+        if index_task is not None:
+            index_task.cancel()
+        await user_cache.close()
+        db.close()
+
+# orjson for every JSON response. The read handlers below also return the
+# response object themselves, which skips FastAPI's jsonable_encoder pass
+# over every row.
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 class User(BaseModel):
     user_name: str
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
+class UserUpdate(BaseModel):
+    user_id: int
+    user_name: str
+
+class CreateUsersBatch(BaseModel):
+    users: List[User] = Field(max_length=BATCH_MAX_ITEMS)
+
+class UpdateUsersBatch(BaseModel):
+    users: List[UserUpdate] = Field(max_length=BATCH_MAX_ITEMS)
+
+class DeleteUsersBatch(BaseModel):
+    user_ids: List[int] = Field(max_length=BATCH_MAX_ITEMS)
+
 @app.post("/users")
-async def create_user(user: User, conn = Depends(get_db)):
-    cursor = conn.cursor()
-    try:
-        cursor.execute("INSERT INTO users (user_name, created_at) VALUES (%s, NOW())", (user.user_name,))
-        conn.commit()
-        user_id = cursor.lastrowid
-        return {"message": "User created successfully", "user_id": user_id, "user_name": user.user_name}
-    finally:
-        cursor.close()
+async def create_user(user: User):
+    user_id = await adb.run(users_repo.create_user, user.user_name)
+    change_notifier.notify()
+    return {"message": "User created successfully", "user_id": user_id, "user_name": user.user_name}
 
 @app.get("/users")
-async def get_all_users(conn = Depends(get_db)):
-    cursor = conn.cursor()
+async def get_all_users(
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    format: Literal["json", "ndjson"] = "json"
+):
+    if format == "ndjson":
+        return StreamingResponse(export_users_ndjson(after_id), media_type="application/x-ndjson")
+
+    users = await adb.run(users_repo.get_users_page, after_id, limit)
+    next_after_id = users[-1]["id"] if len(users) == limit else None
+    return ORJSONResponse({"users": users, "next_after_id": next_after_id})
+
+def export_users_ndjson(after_id: int):
+    # Starlette iterates sync generators on a worker thread. The export gets its
+    # own connection so a slow client never holds a pool slot.
+    conn = db.connect()
     try:
-        cursor.execute("SELECT * FROM users")
-        users = cursor.fetchall()
-        return {"users": users}
+        for rows in users_repo.iter_users(conn, after_id, EXPORT_BATCH_SIZE):
+            yield serialization.dumps_lines(rows)
     finally:
-        cursor.close()
+        conn.close()
 
-@app.get("/users/{user_id}")
-async def get_user(user_id: int, conn = Depends(get_db)):
-    cursor = conn.cursor()
+# These two are registered before /users/{user_id}, which would otherwise match them.
+@app.get("/users/search")
+async def search_users(
+    prefix: str = Query(..., min_length=1, max_length=50),
+    limit: int = Query(SEARCH_LIMIT, ge=1, le=MAX_PAGE_SIZE)
+):
+    if name_index.ready:
+        return ORJSONResponse({"users": name_index.search(prefix, limit)})
+    return ORJSONResponse({"users": await adb.run(users_repo.search_users, prefix, limit)})
+
+@app.get("/users/changes")
+async def get_user_changes(
+    since: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    format: Literal["json", "sse"] = "json",
+    last_event_id: Optional[str] = Header(None)
+):
     try:
-        cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
-        user = cursor.fetchone()
-        if user is None:
-            return {"error": "User not found"}
-        return {"user": user}
-    finally:
-        cursor.close()
+        position = decode_token(since or last_event_id)
+    except InvalidTokenError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "sse":
+        return StreamingResponse(stream_user_changes(position, limit), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    changes, position, has_more = await adb.run(users_repo.get_changes, position, limit, FEED_SAFETY_LAG)
+    return ORJSONResponse({"changes": changes, "next": encode_token(position), "has_more": has_more})
+
+async def stream_user_changes(position, limit: int):
+    # Each event's id is the token after it, so a reconnecting EventSource
+    # resumes through Last-Event-ID. Local writes wake the stream; writes on
+    # other replicas are picked up by polling every FEED_POLL_INTERVAL.
+    yield f"retry: {int(FEED_POLL_INTERVAL * 1000)}\n\n".encode()
+    while True:
+        changes, position, has_more = await adb.run(users_repo.get_changes, position, limit, FEED_SAFETY_LAG)
+        if changes:
+            token = encode_token(position)
+            yield b"".join(b"id: " + token.encode() + b"\nevent: change\ndata: " + serialization.dumps(change) + b"\n\n"
+                           for change in changes)
+        if has_more:
+            continue
+        if await change_notifier.wait(FEED_POLL_INTERVAL):
+            # The write is only returned once it is older than the safety lag;
+            # timestamps have one-second resolution.
+            await asyncio.sleep(FEED_SAFETY_LAG + 1)
+        elif not changes:
+            yield b": keepalive\n\n"
+
+@app.get("/users/{user_id}")
+async def get_user(user_id: int):
+    hit, user = await user_cache.get(user_id)
+    if not hit:
+        # Taken before the read so a PUT/DELETE that lands meanwhile keeps this row out of the cache.
+        token = await user_cache.token(user_id)
+        user = await adb.run(users_repo.get_user, user_id)
+        if user is not None:
+            await user_cache.set(user_id, user, token)
+    if user is None:
+        return {"error": "User not found"}
+    return ORJSONResponse({"user": user})
 
 @app.put("/users/{user_id}")
-async def update_user_name(user_id: int,user: User, conn = Depends(get_db)):
-    cursor = conn.cursor()
-    try:
-        cursor.execute("UPDATE users SET user_name = %s, updated_at = NOW() WHERE id = %s", (user.user_name, user_id))
-        conn.commit()
-        if cursor.rowcount == 0:
-            return {"error": "User not found"}
-        return {"message": "User updated successfully", "user_id": user_id, "user_name": user.user_name}
-    finally:
-        cursor.close()
+async def update_user_name(user_id: int, user: User):
+    updated = await adb.run(users_repo.update_user_name, user_id, user.user_name)
+    await user_cache.delete_many([user_id])
+    change_notifier.notify()
+    if not updated:
+        return {"error": "User not found"}
+    return {"message": "User updated successfully", "user_id": user_id, "user_name": user.user_name}
 
 @app.delete("/users/{user_id}")
-async def delete_user(user_id: int, conn = Depends(get_db)):
-    cursor = conn.cursor()
+async def delete_user(user_id: int):
+    deleted = await adb.run(users_repo.delete_user, user_id)
+    await user_cache.delete_many([user_id])
+    change_notifier.notify()
+    if not deleted:
+        return {"error": "User not found"}
+    return {"message": f"User with id {user_id} was deleted successfully"}
+
+def _batch_response(results: List[dict]) -> dict:
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    return {"summary": summary, "results": results}
+
+@app.post("/users:batch")
+async def create_users_batch(batch: CreateUsersBatch, chunk_size: int = Query(BATCH_CHUNK_SIZE, ge=1, le=users_repo.MAX_CHUNK_SIZE)):
+    names = [user.user_name for user in batch.users]
+    results = await adb.run(users_repo.create_users, names, chunk_size)
+    change_notifier.notify()
+    return _batch_response(results)
+
+@app.put("/users:batch")
+async def update_users_batch(batch: UpdateUsersBatch, chunk_size: int = Query(BATCH_CHUNK_SIZE, ge=1, le=users_repo.MAX_CHUNK_SIZE)):
+    updates = [(user.user_id, user.user_name) for user in batch.users]
+    results = await adb.run(users_repo.update_user_names, updates, chunk_size)
+    await user_cache.delete_many(r["user_id"] for r in results if r["status"] == "updated")
+    change_notifier.notify()
+    return _batch_response(results)
+
+@app.delete("/users:batch")
+async def delete_users_batch(batch: DeleteUsersBatch, chunk_size: int = Query(BATCH_CHUNK_SIZE, ge=1, le=users_repo.MAX_CHUNK_SIZE)):
+    results = await adb.run(users_repo.delete_users, batch.user_ids, chunk_size)
+    await user_cache.delete_many(r["user_id"] for r in results if r["status"] == "deleted")
+    change_notifier.notify()
+    return _batch_response(results)
+
+@app.get("/metrics")
+def metrics():
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+async def profile(
+    seconds: float = Query(5.0, gt=0, le=profiler.MAX_SECONDS),
+    interval_ms: float = Query(5.0, ge=1)
+):
+    # Own thread, not the database limiter, so profiling never takes a pool slot.
     try:
-        cursor.execute("DELETE FROM users WHERE id = %s", (user_id))
-        conn.commit()
-        if cursor.rowcount == 0:
-            return {"error": "User not found"}
-        return {"message": f"User with id {user_id} was deleted successfully"}
-    finally:
-        cursor.close()
+        stacks = await anyio.to_thread.run_sync(profiler.sample, seconds, interval_ms / 1000)
+    except profiler.ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(stacks)
+
+# Opt-in: stacks expose code paths, so the route only exists when enabled.
+if PROFILER_ENABLED:
+    app.add_api_route("/debug/profile", profile, methods=["GET"])
 
 if __name__ == "__main__":
     uvicorn.run(
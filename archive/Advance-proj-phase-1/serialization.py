@@ -0,0 +1,30 @@
+"""Rows to JSON.
+
+Rows leave users_repo as plain dicts with fixed keys. They are encoded with
+orjson, which handles datetime natively (ISO 8601, same as
+datetime.isoformat for naive values), so no per-row conversion happens in
+Python.
+"""
+from functools import partial
+from typing import Callable, Iterable, Sequence
+
+import orjson
+
+loads = orjson.loads
+dumps = orjson.dumps
+_dumps_line = partial(orjson.dumps, option=orjson.OPT_APPEND_NEWLINE)
+
+
+def row_factory(fields: Sequence[str]) -> Callable[[tuple], dict]:
+    """Return a function turning a row tuple into {field: value}."""
+    fields = tuple(fields)
+
+    def to_dict(row: tuple) -> dict:
+        return dict(zip(fields, row))
+
+    return to_dict
+
+
+def dumps_lines(rows: Iterable[dict]) -> bytes:
+    """NDJSON: one encoded row per line."""
+    return b"".join(map(_dumps_line, rows))
@@ -0,0 +1,321 @@
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+import pymysql
+from serialization import row_factory
+from db_metrics import InstrumentedSSCursor
+
+USER_FIELDS = ("id", "user_name", "created_at", "updated_at")
+USER_COLUMNS = ", ".join(USER_FIELDS)
+user_row = row_factory(USER_FIELDS)
+name_row = row_factory(("id", "user_name"))
+
+# Tombstones are written by the same statement shape for single and batch deletes.
+INSERT_TOMBSTONES = "INSERT INTO user_tombstones (user_id, deleted_at) SELECT id, NOW() FROM users WHERE id IN ({})"
+FEED_START = datetime(1970, 1, 2)
+# pymysql splits executemany into several INSERTs past max_stmt_length (1,024,000
+# bytes). A user_name row costs at most ~205 bytes (50 escaped 4-byte characters,
+# quotes and separator), so a chunk of this many rows is always one statement.
+MAX_CHUNK_SIZE = 4000
+
+
+def create_user(conn, user_name: str) -> int:
+    cursor = conn.cursor()
+    try:
+        cursor.execute("INSERT INTO users (user_name, created_at) VALUES (%s, NOW())", (user_name,))
+        conn.commit()
+        return cursor.lastrowid
+    finally:
+        cursor.close()
+
+
+def get_users_page(conn, after_id: int, limit: int) -> List[dict]:
+    """One page of users ordered by primary key, starting after after_id."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"SELECT {USER_COLUMNS} FROM users WHERE id > %s ORDER BY id LIMIT %s",
+            (after_id, limit)
+        )
+        return list(map(user_row, cursor.fetchall()))
+    finally:
+        cursor.close()
+
+
+def iter_users(conn, after_id: int = 0, batch_size: int = 1000) -> Iterator[List[dict]]:
+    """Yield batches of users read through an unbuffered server-side cursor.
+
+    Rows are pulled off the socket as they are consumed, so memory stays flat
+    regardless of table size. The connection is busy until the iterator is
+    exhausted and should not be shared.
+    """
+    cursor = conn.cursor(InstrumentedSSCursor)
+    cursor.execute(f"SELECT {USER_COLUMNS} FROM users WHERE id > %s ORDER BY id", (after_id,))
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield list(map(user_row, rows))
+    cursor.close()
+
+
+def get_user(conn, user_id: int) -> Optional[dict]:
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT {USER_COLUMNS} FROM users WHERE id = %s", (user_id,))
+        row = cursor.fetchone()
+        return user_row(row) if row is not None else None
+    finally:
+        cursor.close()
+
+
+def like_prefix(prefix: str) -> str:
+    """LIKE pattern matching names that start with prefix; `!` is the escape character."""
+    return prefix.replace("!", "!!").replace("%", "!%").replace("_", "!_") + "%"
+
+
+def search_users(conn, prefix: str, limit: int) -> List[dict]:
+    """Users whose name starts with prefix, in user_name order.
+
+    A LIKE with a constant prefix is a range scan on the user_name UNIQUE
+    index, bounded by the column's collation (case-insensitive), and LIMIT
+    stops it early. Only id and user_name are read, so the index covers it.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT id, user_name FROM users WHERE user_name LIKE %s ESCAPE '!' ORDER BY user_name LIMIT %s",
+            (like_prefix(prefix), limit)
+        )
+        return list(map(name_row, cursor.fetchall()))
+    finally:
+        cursor.close()
+
+
+def update_user_name(conn, user_id: int, user_name: str) -> bool:
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE users SET user_name = %s, updated_at = NOW() WHERE id = %s", (user_name, user_id))
+        conn.commit()
+        return cursor.rowcount > 0
+    finally:
+        cursor.close()
+
+
+def delete_user(conn, user_id: int) -> bool:
+    cursor = conn.cursor()
+    try:
+        cursor.execute(INSERT_TOMBSTONES.format("%s"), (user_id,))
+        cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        conn.commit()
+        return cursor.rowcount > 0
+    finally:
+        cursor.close()
+
+
+def _chunks(items: list, size: int) -> Iterator[list]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _placeholders(count: int) -> str:
+    return ", ".join(["%s"] * count)
+
+
+def create_users(conn, user_names: List[str], chunk_size: int) -> List[dict]:
+    """Insert many users in one transaction, chunk_size rows per INSERT.
+
+    Returns one result per input name, in input order. Names that already
+    exist, or repeat earlier in the batch, are reported as conflicts.
+    """
+    results = [None] * len(user_names)
+    pending = []
+    seen = set()
+    for index, user_name in enumerate(user_names):
+        if user_name in seen:
+            results[index] = {"user_name": user_name, "status": "conflict", "error": "Duplicate user_name in batch"}
+        else:
+            seen.add(user_name)
+            pending.append((index, user_name))
+
+    cursor = conn.cursor()
+    try:
+        for chunk in _chunks(pending, chunk_size):
+            names = [user_name for _, user_name in chunk]
+            cursor.execute(f"SELECT user_name FROM users WHERE user_name IN ({_placeholders(len(names))})", names)
+            existing = {row[0] for row in cursor.fetchall()}
+            to_insert = [user_name for user_name in names if user_name not in existing]
+
+            conflicts = set(existing)
+            if to_insert:
+                cursor.execute("SAVEPOINT insert_chunk")
+                try:
+                    # A plain VALUES (%s) lets pymysql rewrite this into one multi-row INSERT.
+                    cursor.executemany("INSERT INTO users (user_name) VALUES (%s)", [(n,) for n in to_insert])
+                except pymysql.err.IntegrityError:
+                    # Lost a race with another writer (or the UNIQUE index collation
+                    # matched where Python did not). Undo whatever part of the chunk
+                    # went in, then retry row by row to find the conflicts.
+                    cursor.execute("ROLLBACK TO SAVEPOINT insert_chunk")
+                    for user_name in to_insert:
+                        try:
+                            cursor.execute("INSERT INTO users (user_name) VALUES (%s)", (user_name,))
+                        except pymysql.err.IntegrityError:
+                            conflicts.add(user_name)
+
+            inserted = [user_name for user_name in to_insert if user_name not in conflicts]
+            ids = {}
+            if inserted:
+                cursor.execute(f"SELECT id, user_name FROM users WHERE user_name IN ({_placeholders(len(inserted))})", inserted)
+                ids = {row[1]: row[0] for row in cursor.fetchall()}
+
+            for index, user_name in chunk:
+                if user_name in conflicts:
+                    results[index] = {"user_name": user_name, "status": "conflict", "error": "user_name already exists"}
+                else:
+                    results[index] = {"user_name": user_name, "status": "created", "user_id": ids.get(user_name)}
+        conn.commit()
+        return results
+    finally:
+        cursor.close()
+
+
+def update_user_names(conn, updates: List[tuple], chunk_size: int) -> List[dict]:
+    """Rename many users in one transaction, one UPDATE per chunk.
+
+    updates is a list of (user_id, user_name) pairs. Returns one result per
+    pair with status updated, not_found or conflict.
+    """
+    results = [None] * len(updates)
+    pending = []
+    seen_ids = set()
+    seen_names = set()
+    for index, (user_id, user_name) in enumerate(updates):
+        if user_id in seen_ids or user_name in seen_names:
+            results[index] = {"user_id": user_id, "user_name": user_name, "status": "conflict",
+                              "error": "Duplicate user_id or user_name in batch"}
+        else:
+            seen_ids.add(user_id)
+            seen_names.add(user_name)
+            pending.append((index, user_id, user_name))
+
+    cursor = conn.cursor()
+    try:
+        for chunk in _chunks(pending, chunk_size):
+            ids = [user_id for _, user_id, _ in chunk]
+            names = [user_name for _, _, user_name in chunk]
+            cursor.execute(f"SELECT id FROM users WHERE id IN ({_placeholders(len(ids))}) FOR UPDATE", ids)
+            found = {row[0] for row in cursor.fetchall()}
+            cursor.execute(f"SELECT id, user_name FROM users WHERE user_name IN ({_placeholders(len(names))})", names)
+            owners = {row[1]: row[0] for row in cursor.fetchall()}
+
+            statuses = {}
+            to_update = []
+            for _, user_id, user_name in chunk:
+                if user_id not in found:
+                    statuses[user_id] = "not_found"
+                elif owners.get(user_name, user_id) != user_id:
+                    statuses[user_id] = "conflict"
+                else:
+                    statuses[user_id] = "updated"
+                    to_update.append((user_id, user_name))
+
+            if to_update:
+                cases = " ".join(["WHEN %s THEN %s"] * len(to_update))
+                params = [value for pair in to_update for value in pair] + [user_id for user_id, _ in to_update]
+                try:
+                    cursor.execute(
+                        f"UPDATE users SET user_name = CASE id {cases} END, updated_at = NOW() "
+                        f"WHERE id IN ({_placeholders(len(to_update))})",
+                        params
+                    )
+                except pymysql.err.IntegrityError:
+                    for user_id, user_name in to_update:
+                        try:
+                            cursor.execute("UPDATE users SET user_name = %s, updated_at = NOW() WHERE id = %s",
+                                           (user_name, user_id))
+                        except pymysql.err.IntegrityError:
+                            statuses[user_id] = "conflict"
+
+            for index, user_id, user_name in chunk:
+                result = {"user_id": user_id, "user_name": user_name, "status": statuses[user_id]}
+                if statuses[user_id] == "not_found":
+                    result["error"] = "User not found"
+                elif statuses[user_id] == "conflict":
+                    result["error"] = "user_name already exists"
+                results[index] = result
+        conn.commit()
+        return results
+    finally:
+        cursor.close()
+
+
+def delete_users(conn, user_ids: List[int], chunk_size: int) -> List[dict]:
+    """Delete many users in one transaction, one DELETE per chunk."""
+    unique_ids = list(dict.fromkeys(user_ids))
+    deleted = set()
+    cursor = conn.cursor()
+    try:
+        for chunk in _chunks(unique_ids, chunk_size):
+            cursor.execute(f"SELECT id FROM users WHERE id IN ({_placeholders(len(chunk))}) FOR UPDATE", chunk)
+            found = [row[0] for row in cursor.fetchall()]
+            if found:
+                cursor.execute(INSERT_TOMBSTONES.format(_placeholders(len(found))), found)
+                cursor.execute(f"DELETE FROM users WHERE id IN ({_placeholders(len(found))})", found)
+                deleted.update(found)
+        conn.commit()
+    finally:
+        cursor.close()
+
+    results = []
+    reported = set()
+    for user_id in user_ids:
+        if user_id in reported:
+            results.append({"user_id": user_id, "status": "conflict", "error": "Duplicate user_id in batch"})
+        elif user_id in deleted:
+            results.append({"user_id": user_id, "status": "deleted"})
+        else:
+            results.append({"user_id": user_id, "status": "not_found", "error": "User not found"})
+        reported.add(user_id)
+    return results
+
+
+def get_changes(conn, position: Optional[tuple], limit: int, lag: float) -> Tuple[List[dict], tuple, bool]:
+    """Users changed and deleted after position, oldest first.
+
+    position is (updated_at, id, deleted_at, user_id): how far the users and
+    tombstone scans have got, or None to start from the beginning. Only rows
+    older than `lag` seconds are returned, so a transaction that stamped
+    updated_at before committing is not skipped past. Returns the changes,
+    the new position and whether more are already available.
+    """
+    users_at, users_id, deleted_at, deleted_id = position or (FEED_START, 0, FEED_START, 0)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"SELECT {USER_COLUMNS} FROM users "
+            "WHERE (updated_at > %s OR (updated_at = %s AND id > %s)) AND updated_at < NOW() - INTERVAL %s SECOND "
+            "ORDER BY updated_at, id LIMIT %s",
+            (users_at, users_at, users_id, lag, limit + 1)
+        )
+        users = cursor.fetchall()
+        cursor.execute(
+            "SELECT user_id, deleted_at FROM user_tombstones "
+            "WHERE (deleted_at > %s OR (deleted_at = %s AND user_id > %s)) AND deleted_at < NOW() - INTERVAL %s SECOND "
+            "ORDER BY deleted_at, user_id LIMIT %s",
+            (deleted_at, deleted_at, deleted_id, lag, limit + 1)
+        )
+        tombstones = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    # Merge both scans by time; a delete sorts after an update of the same second.
+    merged = sorted([(row[3], 0, row[0], row) for row in users] + [(row[1], 1, row[0], row) for row in tombstones])
+    changes = []
+    for at, is_delete, key, row in merged[:limit]:
+        if is_delete:
+            deleted_at, deleted_id = at, key
+            changes.append({"op": "delete", "id": key, "at": at})
+        else:
+            users_at, users_id = at, key
+            changes.append({"op": "upsert", "id": key, "at": at, "user": user_row(row)})
+    return changes, (users_at, users_id, deleted_at, deleted_id), len(merged) > limit
@@ -0,0 +1,91 @@
+"""Requests/sec of the visit counter per consistency mode, shard count and replica count.
+
+Needs a local redis-server (REDIS_HOST/REDIS_PORT, default localhost:6379,
+or a cluster with REDIS_CLUSTER=true). Each replica is a separate process
+driving the Flask app in-process with several threads, the way Deployment
+replicas share one Redis.
+
+    redis-server --daemonize yes
+    python bench_counter.py --seconds 5 --threads 4 --replicas 1,2,4,8 --shards 1,8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "shared"))
+
+from counter import VisitCounter, create_redis_client
+
+
+def replica(mode: str, shards: int, key: str, seconds: float, threads: int, results) -> None:
+    import app as app_module
+
+    app_module.counter = VisitCounter(create_redis_client(), key=key, mode=mode, shards=shards)
+    done = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def worker(index):
+        test_client = app_module.app.test_client()
+        while time.perf_counter() < deadline:
+            test_client.get("/")
+            done[index] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    app_module.counter.close()
+    results.put(sum(done))
+
+
+def run(mode: str, shards: int, replicas: int, seconds: float, threads: int) -> dict:
+    key = f"bench:counter:{mode}:{shards}:{replicas}"
+    probe = VisitCounter(create_redis_client(), key=key, shards=shards)
+    probe.client.delete(*probe._read_keys)
+
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=replica, args=(mode, shards, key, seconds, threads, results))
+                 for _ in range(replicas)]
+    start = time.perf_counter()
+    for p in processes:
+        p.start()
+    requests = sum(results.get() for _ in processes)
+    for p in processes:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    pipe = probe.client.pipeline(transaction=False)
+    for k in probe._read_keys:
+        pipe.get(k)
+    stored = sum(int(v or 0) for v in pipe.execute())
+    return {
+        "mode": mode,
+        "shards": shards,
+        "replicas": replicas,
+        "requests": requests,
+        "requests_per_second": round(requests / elapsed, 1),
+        "lost_visits": requests - stored,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--threads", type=int, default=4, help="threads per replica")
+    parser.add_argument("--replicas", default="1,2,4", help="comma-separated replica counts")
+    parser.add_argument("--shards", default="1,8", help="comma-separated shard counts")
+    parser.add_argument("--modes", default="exact,approximate")
+    args = parser.parse_args()
+
+    report = [
+        run(mode, int(shards), int(replicas), args.seconds, args.threads)
+        for mode in args.modes.split(",")
+        for shards in args.shards.split(",")
+        for replicas in args.replicas.split(",")
+    ]
+    print(json.dumps(report, indent=2))
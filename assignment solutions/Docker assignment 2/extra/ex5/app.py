@@ -2,17 +2,18 @@ from flask import Flask
 import logging
 import os
 
+from logging_pipeline import setup_logging
+
 app = Flask(__name__)
 
 # Ensure log directory exists
-log_dir = '/var/log/flask-data'
+log_dir = os.getenv('LOG_DIR', '/var/log/flask-data')
 if not os.path.exists(log_dir):
     os.makedirs(log_dir)
 
 
-# Set up logging to a file
-logging.basicConfig(filename=f'{log_dir}/app.log', level=logging.INFO)
-logger = logging.getLogger()
+# Log to a file through a queue; a background thread does the writes
+logger = setup_logging(f'{log_dir}/app.log', level=logging.INFO)
 
 @app.route('/')
 def hello_world():
@@ -21,4 +22,3 @@ def hello_world():
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
-~
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""Request latency of the Flask app with the old basicConfig file logging vs the queue pipeline.
+
+Drives the app in-process with several threads and reports p50/p99/max
+latency per setup. Logs go to a temporary directory. --flush-delay-ms adds
+a sleep to every flush of the log file, to mimic a slow or contended volume
+(network storage, a busy node disk) where the difference shows up.
+
+    python bench_logging.py --requests 20000 --threads 8
+    python bench_logging.py --flush-delay-ms 2
+    LOG_FORMAT=json python bench_logging.py
+"""
+import argparse
+import builtins
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import logging_pipeline
+
+os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="bench-logging-"))
+FLUSH_DELAY = 0.0
+
+
+class SlowFile:
+    def __init__(self, file):
+        self._file = file
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def flush(self):
+        self._file.flush()
+        if FLUSH_DELAY:
+            time.sleep(FLUSH_DELAY)
+
+
+logging_pipeline.open = lambda *args, **kwargs: SlowFile(builtins.open(*args, **kwargs))
+
+import app as app_module  # noqa: E402  (starts the pipeline on import)
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def drive(total: int, threads: int) -> dict:
+    latencies = [[] for _ in range(threads)]
+
+    def worker(index):
+        client = app_module.app.test_client()
+        for _ in range(total // threads):
+            start = time.perf_counter()
+            client.get("/")
+            latencies[index].append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    values = sorted(v for per_thread in latencies for v in per_thread)
+    return {
+        "requests": len(values),
+        "requests_per_second": round(len(values) / elapsed, 1),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--flush-delay-ms", type=float, default=0.0, help="simulated slow-disk delay per flush")
+    args = parser.parse_args()
+    FLUSH_DELAY = args.flush_delay_ms / 1000
+
+    root = logging.getLogger()
+    pipeline_handlers = root.handlers[:]
+
+    # The previous setup: logging.basicConfig(filename=...) on the request thread.
+    for handler in pipeline_handlers:
+        root.removeHandler(handler)
+    logging.basicConfig(filename=os.path.join(app_module.log_dir, "basic.log"), level=logging.INFO)
+    root.handlers[0].stream = SlowFile(root.handlers[0].stream)
+    drive(500, args.threads)  # warm-up
+    basic = drive(args.requests, args.threads)
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+    for handler in pipeline_handlers:
+        root.addHandler(handler)
+    drive(500, args.threads)
+    pipeline = drive(args.requests, args.threads)
+
+    print(json.dumps({
+        "log_dir": app_module.log_dir,
+        "threads": args.threads,
+        "flush_delay_ms": args.flush_delay_ms,
+        "basicConfig": basic,
+        "queue_pipeline": pipeline,
+        "dropped_records": pipeline_handlers[0].dropped,
+    }, indent=2))
@@ -0,0 +1,264 @@
+"""Non-blocking file logging.
+
+Request threads only put log records on a bounded queue. A background writer
+thread formats them and writes them to the file in batches (one unbuffered
+write per batch), rotating by size and/or age.
+
+When the queue is full the policy decides what happens:
+  drop_new     drop the incoming record (never blocks the request)
+  drop_oldest  drop the oldest queued record to make room
+  block        wait up to LOG_BLOCK_TIMEOUT seconds, then drop
+Dropped records are counted and reported in the log once space frees up.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+TEXT_FORMAT = "%(levelname)s:%(name)s:%(message)s"  # same as logging.basicConfig
+POLICIES = ("drop_new", "drop_oldest", "block")
+_STOP = object()
+# Message args of these types can be formatted later on the writer thread.
+_IMMUTABLE = (str, int, float, bool, bytes, type(None))
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class PolicyQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue, policy: str = "drop_new", block_timeout: float = 0.05):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        super().__init__(log_queue)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Queue a shallow copy, leaving formatting (and exc_info) to the writer.
+
+        QueueHandler.prepare formats on the calling thread and drops exc_info.
+        Only a message with mutable args is rendered here, since the caller
+        may change them before the writer gets to the record.
+        """
+        record = copy.copy(record)
+        args = record.args
+        if args:
+            values = args.values() if isinstance(args, dict) else args
+            if not all(isinstance(value, _IMMUTABLE) for value in values):
+                record.msg, record.args = record.getMessage(), None
+        elif not isinstance(record.msg, str):
+            record.msg = str(record.msg)
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.policy == "block":
+            try:
+                self.queue.put(record, timeout=self.block_timeout)
+            except queue.Full:
+                self.dropped += 1
+            return
+
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                if self.policy == "drop_new":
+                    self.dropped += 1
+                    return
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+
+
+class BatchingFileWriter:
+    """Background thread draining the queue into a rotating file."""
+
+    def __init__(self, log_queue: queue.Queue, path: str, formatter: logging.Formatter,
+                 handler: PolicyQueueHandler, batch_size: int = 512, flush_interval: float = 0.2,
+                 max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5, rotate_interval: float = 0):
+        self.queue = log_queue
+        self.path = path
+        self.formatter = formatter
+        self.handler = handler
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_interval = rotate_interval
+        self._thread = None
+        self._file = None
+        self._reported_drops = 0
+
+    def start(self) -> None:
+        self._open()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self.queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def abandon(self) -> None:
+        """Close the file in a forked child, where the writer thread doesn't exist."""
+        # Unbuffered, so this is a plain close: nothing of the parent's is flushed again.
+        self._file.close()
+        self._thread = None
+
+    def _open(self) -> None:
+        # Unbuffered binary: each batch is one write() with O_APPEND, and a
+        # forked child can close the inherited file without flushing a buffer.
+        self._file = open(self.path, "ab", buffering=0)
+        self._size = self._file.tell()
+        self._next_rollover = time.time() + self.rotate_interval if self.rotate_interval else None
+
+    def _run(self) -> None:
+        while True:
+            record = self.queue.get()
+            stop = record is _STOP
+            batch = [] if stop else [record]
+            deadline = time.monotonic() + self.flush_interval
+            while not stop and len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    record = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stop = True
+                else:
+                    batch.append(record)
+
+            self._write(batch)
+            if stop:
+                self._file.close()
+                return
+
+    def _write(self, batch: list) -> None:
+        lines = []
+        for record in batch:
+            try:
+                lines.append(self.formatter.format(record))
+            except Exception:
+                logging.Handler.handleError(self.handler, record)
+        dropped = self.handler.dropped
+        if dropped != self._reported_drops:
+            lines.append(f"WARNING:logging_pipeline:dropped {dropped - self._reported_drops} log records (queue full)")
+            self._reported_drops = dropped
+        if not lines:
+            return
+
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        self._reopen_if_moved()
+        if self._should_rollover(len(data)):
+            self._rollover()
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+
+    def _reopen_if_moved(self) -> None:
+        # With several gunicorn workers appending to one file, another worker
+        # may have rotated it; follow the path like WatchedFileHandler does.
+        try:
+            moved = os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            moved = True
+        if moved:
+            self._file.close()
+            self._open()
+
+    def _should_rollover(self, incoming: int) -> bool:
+        if self.max_bytes and self._size and self._size + incoming > self.max_bytes:
+            return True
+        return self._next_rollover is not None and time.time() >= self._next_rollover
+
+    def _rollover(self) -> None:
+        self._file.close()
+        if not os.path.exists(self.path):
+            pass  # another process rotated it first
+        elif self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+
+def setup_logging(path: str, level: int = logging.INFO) -> logging.Logger:
+    """Route the root logger through the queue and start the writer thread.
+
+    Configuration comes from LOG_FORMAT (text|json), LOG_QUEUE_SIZE,
+    LOG_QUEUE_POLICY, LOG_BLOCK_TIMEOUT, LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL,
+    LOG_MAX_BYTES, LOG_BACKUP_COUNT and LOG_ROTATE_INTERVAL (seconds, 0 = off).
+    """
+    log_queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", 10000)))
+    handler = PolicyQueueHandler(
+        log_queue,
+        policy=os.getenv("LOG_QUEUE_POLICY", "drop_new"),
+        block_timeout=float(os.getenv("LOG_BLOCK_TIMEOUT", 0.05)),
+    )
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+
+    def make_writer(log_queue):
+        return BatchingFileWriter(
+            log_queue, path, formatter, handler,
+            batch_size=int(os.getenv("LOG_BATCH_SIZE", 512)),
+            flush_interval=float(os.getenv("LOG_FLUSH_INTERVAL", 0.2)),
+            max_bytes=int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+            backup_count=int(os.getenv("LOG_BACKUP_COUNT", 5)),
+            rotate_interval=float(os.getenv("LOG_ROTATE_INTERVAL", 0)),
+        )
+
+    writers = [make_writer(log_queue)]
+    writers[0].start()
+
+    def restart_after_fork():
+        # Threads don't survive fork, and the old queue still lists the parent's
+        # writer as its waiter, so puts would never wake a new one. A new queue
+        # also leaves the records queued in the parent to the parent.
+        writers[0].abandon()
+        handler.queue = queue.Queue(maxsize=handler.queue.maxsize)
+        writers[0] = make_writer(handler.queue)
+        writers[0].start()
+
+    os.register_at_fork(after_in_child=restart_after_fork)
+    atexit.register(lambda: writers[0].stop())
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    return root
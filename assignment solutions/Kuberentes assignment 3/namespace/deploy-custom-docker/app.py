@@ -1,17 +1,15 @@
 from flask import Flask
-import redis
-import os
+from counter import create_counter
 
 app = Flask(__name__)
 
 # Connect to Redis using environment variables (with fallback)
-redis_host = os.getenv("REDIS_HOST", "localhost")
-redis_port = int(os.getenv("REDIS_PORT", 6379))
-r = redis.Redis(host=redis_host, port=redis_port, decode_responses=True)
+# REDIS_HOST/REDIS_PORT pick the server, COUNTER_MODE=exact|approximate picks the consistency mode
+counter = create_counter()
 
 @app.route('/')
 def home():
-    visits = r.incr("counter")
+    visits = counter.incr()
     return f"Hello! This page has been visited {visits} times."
 
 if __name__ == '__main__':
@@ -1,12 +1,65 @@
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request
+import os
 import random
+import secrets
+import numpy as np
 
 app = Flask(__name__)
 
+LOW, HIGH = 1, 100
+MAX_BATCH = int(os.getenv("MAX_BATCH_SIZE", 10_000_000))
+MAX_JSON_BATCH = int(os.getenv("MAX_JSON_BATCH_SIZE", 10_000))  # larger batches must use ndjson/binary
+CHUNK = 65_536
+BINARY_DTYPE = np.dtype("<i4")  # little-endian int32
+
+
+def generate(n, seed):
+    """Yield n numbers in [LOW, HIGH] as int32 arrays of up to CHUNK items.
+
+    All formats use the same chunking, so a given (seed, n) always yields
+    the same numbers whichever format is requested.
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, n, CHUNK):
+        yield rng.integers(LOW, HIGH, size=min(CHUNK, n - start), endpoint=True, dtype=BINARY_DTYPE)
+
+
+def bad_request(message):
+    return jsonify({"error": message}), 400
+
+
 @app.route('/')
 def random_number():
-    number = random.randint(1, 100)
-    return jsonify({"random_number": number})
+    if 'n' not in request.args:
+        number = random.randint(LOW, HIGH)
+        return jsonify({"random_number": number})
+
+    n = request.args.get('n', type=int)
+    if n is None or not 1 <= n <= MAX_BATCH:
+        return bad_request(f"n must be an integer between 1 and {MAX_BATCH}")
+    seed = request.args.get('seed', type=int)
+    if 'seed' in request.args and (seed is None or seed < 0):
+        return bad_request("seed must be a non-negative integer")
+    if seed is None:
+        # Pick one ourselves and report it, so any batch can be reproduced.
+        seed = secrets.randbits(63)
+    fmt = request.args.get('format', 'json')
+    headers = {"X-Seed": str(seed), "X-Count": str(n)}
+
+    if fmt == 'json':
+        if n > MAX_JSON_BATCH:
+            return bad_request(f"format=json is limited to n <= {MAX_JSON_BATCH}; use format=binary or format=ndjson")
+        numbers = np.concatenate(list(generate(n, seed))).tolist()
+        return jsonify({"random_numbers": numbers, "seed": seed}), 200, headers
+    if fmt == 'binary':
+        headers["X-Dtype"] = "int32-le"
+        headers["Content-Length"] = str(n * BINARY_DTYPE.itemsize)
+        body = (chunk.tobytes() for chunk in generate(n, seed))
+        return Response(body, mimetype='application/octet-stream', headers=headers)
+    if fmt == 'ndjson':
+        body = ("\n".join(map(str, chunk.tolist())) + "\n" for chunk in generate(n, seed))
+        return Response(body, mimetype='application/x-ndjson', headers=headers)
+    return bad_request("format must be json, ndjson or binary")
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,75 @@
+"""Samples/sec from one-number-per-request vs the batch endpoint.
+
+Runs in-process through the Flask test client by default, or against a
+running server with --url (e.g. the gunicorn container on :5000).
+
+    python bench_batch.py --seconds 3 --batch-sizes 1000,100000,1000000
+    python bench_batch.py --url http://localhost:5000
+"""
+import argparse
+import json
+import time
+import urllib.request
+
+import numpy as np
+
+from app import MAX_JSON_BATCH, app
+
+
+def fetcher(url):
+    if url:
+        def get(path):
+            with urllib.request.urlopen(url.rstrip("/") + path) as response:
+                return response.read()
+    else:
+        client = app.test_client()
+
+        def get(path):
+            return client.get(path).data
+    return get
+
+
+def per_request(get, seconds):
+    samples = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        json.loads(get("/"))["random_number"]
+        samples += 1
+    return samples / (time.perf_counter() - start)
+
+
+def batched(get, fmt, n, seconds):
+    decode = {
+        "json": lambda body: json.loads(body)["random_numbers"],
+        "ndjson": lambda body: np.array(body.split(), dtype=np.int32),
+        "binary": lambda body: np.frombuffer(body, dtype="<i4"),
+    }[fmt]
+    samples = 0
+    seed = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        values = decode(get(f"/?n={n}&seed={seed}&format={fmt}"))
+        assert len(values) == n
+        samples += n
+        seed += 1
+    return samples / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--seconds", type=float, default=3.0, help="per measurement")
+    parser.add_argument("--batch-sizes", default="1000,100000,1000000")
+    args = parser.parse_args()
+
+    get = fetcher(args.url)
+    report = [{"path": "per_request", "n": 1, "samples_per_second": round(per_request(get, args.seconds))}]
+    for n in map(int, args.batch_sizes.split(",")):
+        for fmt in ("json", "ndjson", "binary"):
+            if fmt == "json" and n > MAX_JSON_BATCH:
+                continue
+            rate = batched(get, fmt, n, args.seconds)
+            report.append({"path": fmt, "n": n, "samples_per_second": round(rate)})
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,102 @@
+"""Microbenchmark of the per-request cost of the metrics middleware.
+
+Calls the ASGI app directly (no sockets or HTTP parsing) so the numbers
+isolate middleware overhead. Compares the bare app, the previous
+@app.middleware("http") implementation and PrometheusMiddleware.
+
+    python bench_middleware.py --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI, Request
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+from metrics import PrometheusMiddleware
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"item_id": item_id}
+
+    return app
+
+
+def add_legacy_middleware(app: FastAPI) -> None:
+    registry = CollectorRegistry()
+    reqs = Counter("http_requests_total", "Total HTTP requests", ["path", "method", "code"], registry=registry)
+    latency = Histogram("http_request_duration_seconds", "Request latency", ["path"], registry=registry)
+    inprog = Gauge("http_requests_in_progress", "Requests in progress", registry=registry)
+
+    @app.middleware("http")
+    async def metrics_middleware(request: Request, call_next):
+        path = request.url.path
+        method = request.method
+        if path == "/metrics":
+            return await call_next(request)
+        start = time.time()
+        inprog.inc()
+        try:
+            response = await call_next(request)
+            code = response.status_code
+            return response
+        finally:
+            inprog.dec()
+            latency.labels(path=path).observe(time.time() - start)
+            reqs.labels(path=path, method=method, code=str(locals().get("code", 500))).inc()
+
+
+async def call(app, path: str) -> None:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1234), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def measure(app, requests: int) -> float:
+    # Distinct IDs per request: the legacy middleware creates a new series for each one.
+    for i in range(200):
+        await call(app, f"/items/{i}")
+    start = time.perf_counter()
+    for i in range(requests):
+        await call(app, f"/items/{i}")
+    return (time.perf_counter() - start) / requests
+
+
+async def main(requests: int) -> None:
+    bare = build_app()
+    legacy = build_app()
+    add_legacy_middleware(legacy)
+    current = PrometheusMiddleware(build_app())
+
+    results = {name: await measure(app, requests) for name, app in
+               (("bare", bare), ("legacy", legacy), ("prometheus_middleware", current))}
+    report = {
+        "requests": requests,
+        "per_request_us": {name: round(value * 1e6, 2) for name, value in results.items()},
+        "overhead_us": {
+            "legacy": round((results["legacy"] - results["bare"]) * 1e6, 2),
+            "prometheus_middleware": round((results["prometheus_middleware"] - results["bare"]) * 1e6, 2),
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    asyncio.run(main(parser.parse_args().requests))
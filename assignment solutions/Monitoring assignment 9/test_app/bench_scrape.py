@@ -0,0 +1,102 @@
+"""Cost of serving /metrics with many series, uncached vs. ScrapeCache.
+
+Fills a private registry with --series label sets (a counter and a
+histogram per path), then reports for text and OpenMetrics formats the
+render time, payload size with and without gzip at each level, and what
+a scrape costs once the payload is cached. It also sends --scrapers
+concurrent scrapes, the way several Prometheus replicas hit one pod, and
+counts how many renders they caused.
+
+    python bench_scrape.py --series 10000
+"""
+import argparse
+import gzip
+import json
+import threading
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Histogram
+from prometheus_client.exposition import choose_encoder
+
+from metrics import ScrapeCache
+
+OPENMETRICS = "application/openmetrics-text; version=1.0.0"
+
+
+def build_registry(series: int) -> CollectorRegistry:
+    registry = CollectorRegistry()
+    requests = Counter("bench_requests_total", "Requests", ["path", "code"], registry=registry)
+    latency = Histogram("bench_request_duration_seconds", "Latency", ["path"], registry=registry)
+    # A histogram child is one _bucket series per bound plus _count and _sum (_created not counted).
+    histograms = series // 20
+    for i in range(series - histograms * (len(latency._upper_bounds) + 2)):
+        requests.labels(path=f"/items/{i}", code=str(200 + i % 5)).inc(i)
+    for i in range(histograms):
+        latency.labels(path=f"/items/{i}").observe(i / histograms)
+    return registry
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def concurrent_renders(registry, scrapers: int) -> int:
+    renders = 0
+
+    def render(encoder):
+        nonlocal renders
+        renders += 1
+        return encoder(registry)
+
+    cache = ScrapeCache(render=render, ttl=5)
+    barrier = threading.Barrier(scrapers)
+
+    def scrape():
+        barrier.wait()
+        cache.get(None, "gzip")
+
+    threads = [threading.Thread(target=scrape) for _ in range(scrapers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return renders
+
+
+def main(args) -> dict:
+    registry = build_registry(args.series)
+    text = choose_encoder(None)[0](registry)
+    report = {"series": args.series,
+              "sample_lines": sum(1 for line in text.splitlines() if line and not line.startswith(b"#"))}
+    for name, accept in (("text", None), ("openmetrics", OPENMETRICS)):
+        encoder, _ = choose_encoder(accept)
+        body = encoder(registry)
+        cache = ScrapeCache(render=lambda encoder: encoder(registry), ttl=3600)
+        cache.get(accept, "gzip")
+        report[name] = {
+            "render_ms": round(best_of(lambda: encoder(registry), args.repeat) * 1000, 2),
+            "bytes": len(body),
+            "gzip": {
+                f"level_{level}": {
+                    "ms": round(best_of(lambda: gzip.compress(body, compresslevel=level), args.repeat) * 1000, 2),
+                    "bytes": len(gzip.compress(body, compresslevel=level)),
+                } for level in (1, 6, 9)
+            },
+            "cached_scrape_us": round(best_of(lambda: cache.get(accept, "gzip"), args.repeat * 100) * 1e6, 2),
+        }
+    report["concurrent_scrapes"] = args.scrapers
+    report["renders_for_concurrent_scrapes"] = concurrent_renders(registry, args.scrapers)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--series", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--scrapers", type=int, default=4)
+    print(json.dumps(main(parser.parse_args()), indent=2))
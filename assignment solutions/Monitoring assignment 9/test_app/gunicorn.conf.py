@@ -0,0 +1,22 @@
+# Multi-worker mode: gunicorn -c gunicorn.conf.py main:app
+# Set PROMETHEUS_MULTIPROC_DIR so /metrics aggregates every worker.
+import math
+import os
+from multiproc import clear_multiproc_dir, compact_dead_process
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+# Leave room for the drain in lifecycle.py before the master kills a worker.
+# gunicorn only accepts an int here.
+graceful_timeout = math.ceil(float(os.getenv("DRAIN_GRACE_SECONDS", "5")) + float(os.getenv("DRAIN_TIMEOUT_SECONDS", "20"))) + 5
+
+
+def on_starting(server):
+    clear_multiproc_dir()
+
+
+def child_exit(server, worker):
+    compact_dead_process(worker.pid)
@@ -0,0 +1,109 @@
+"""Readiness gating and graceful drain.
+
+Readiness is the AND of registered checks (dependency pings, cache warm-up,
+...) and is forced false while draining. On SIGTERM the app:
+
+1. flips readiness to false,
+2. keeps serving for DRAIN_GRACE_SECONDS so Kubernetes can remove the pod
+   from Service endpoints,
+3. waits up to DRAIN_TIMEOUT_SECONDS for in-flight requests to finish,
+4. hands the signal to uvicorn, which closes the listener and exits.
+
+DRAIN_GRACE_SECONDS + DRAIN_TIMEOUT_SECONDS must stay below the pod's
+terminationGracePeriodSeconds (30s by default).
+"""
+import asyncio
+import inspect
+import os
+import signal
+import time
+from typing import Awaitable, Callable, Dict, Optional, Union
+from prometheus_client import Counter, Gauge, Histogram
+
+import metrics
+
+DRAIN_GRACE = float(os.getenv("DRAIN_GRACE_SECONDS", "5"))
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT_SECONDS", "20"))
+CHECK_TIMEOUT = float(os.getenv("READINESS_CHECK_TIMEOUT_SECONDS", "1"))
+
+DRAINING = Gauge("app_draining", "1 while the process is draining before shutdown", multiprocess_mode="livemax")
+DRAIN_DURATION = Histogram("app_drain_duration_seconds", "Time from SIGTERM until shutdown could proceed",
+                           buckets=(0.5, 1, 2, 5, 10, 15, 20, 30, 60))
+DRAIN_LEFTOVER = Counter("app_drain_abandoned_requests_total", "Requests still in flight when the drain timed out")
+READINESS_FAILURES = Counter("app_readiness_check_failures_total", "Failed readiness checks", ["check"])
+
+Check = Callable[[], Union[bool, Awaitable[bool]]]
+
+
+class Lifecycle:
+    def __init__(self, drain_grace: float = DRAIN_GRACE, drain_timeout: float = DRAIN_TIMEOUT):
+        self.drain_grace = drain_grace
+        self.drain_timeout = drain_timeout
+        self.draining = False
+        self._checks: Dict[str, Check] = {}
+        self._drain_task: Optional[asyncio.Task] = None
+
+    def readiness_check(self, name: str):
+        """Decorator registering a sync or async check that returns True when ready."""
+        def register(check: Check) -> Check:
+            self._checks[name] = check
+            return check
+        return register
+
+    async def readiness(self) -> Dict[str, bool]:
+        results = {"accepting_traffic": not self.draining}
+        for name, check in self._checks.items():
+            try:
+                result = check()
+                if inspect.isawaitable(result):
+                    result = await asyncio.wait_for(result, CHECK_TIMEOUT)
+                results[name] = bool(result)
+            except Exception:
+                results[name] = False
+            if not results[name]:
+                READINESS_FAILURES.labels(check=name).inc()
+        return results
+
+    def install_signal_handler(self) -> None:
+        """Put the drain in front of the server's SIGTERM handler. Call from lifespan startup."""
+        loop = asyncio.get_running_loop()
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def forward(signum=signal.SIGTERM, frame=None):
+            if callable(previous):
+                previous(signum, frame)
+            else:
+                signal.signal(signal.SIGTERM, previous)
+                os.kill(os.getpid(), signal.SIGTERM)
+
+        def on_sigterm(signum, frame):
+            if self.draining:
+                # A second SIGTERM skips the rest of the drain.
+                forward(signum, frame)
+                return
+            loop.call_soon_threadsafe(self.start_drain, forward)
+
+        signal.signal(signal.SIGTERM, on_sigterm)
+
+    def start_drain(self, then: Callable[[], None]) -> None:
+        if self._drain_task is None:
+            self._drain_task = asyncio.get_running_loop().create_task(self._drain(then))
+
+    async def _drain(self, then: Callable[[], None]) -> None:
+        started = time.monotonic()
+        self.draining = True
+        DRAINING.set(1)
+        print(f"Draining: readiness off, waiting {self.drain_grace}s for endpoint removal", flush=True)
+        await asyncio.sleep(self.drain_grace)
+
+        deadline = time.monotonic() + self.drain_timeout
+        while metrics.in_progress() > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        leftover = metrics.in_progress()
+        if leftover:
+            DRAIN_LEFTOVER.inc(leftover)
+        elapsed = time.monotonic() - started
+        DRAIN_DURATION.observe(elapsed)
+        print(f"Drain finished in {elapsed:.2f}s with {leftover} requests still in flight", flush=True)
+        then()
@@ -1,37 +1,27 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, Response
-from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
+from metrics import PrometheusMiddleware, scrape_cache
+from lifecycle import Lifecycle
 import time, os
 
-app = FastAPI(title="kube-mon-demo")
-
-# Prometheus metrics
-REQS = Counter("http_requests_total", "Total HTTP requests", ["path", "method", "code"])
-LATENCY = Histogram("http_request_duration_seconds", "Request latency", ["path"])
-INPROG = Gauge("http_requests_in_progress", "Requests in progress")
-
-BOOT_TIME = time.time()
+BOOT_TIME = time.monotonic()
 READY_DELAY = float(os.getenv("READY_DELAY_SECONDS", "0"))  # simulate slow readiness
 STARTUP_DELAY = float(os.getenv("STARTUP_DELAY_SECONDS", "0"))  # simulate slow startup
 
-@app.middleware("http")
-async def metrics_middleware(request: Request, call_next):
-    path = request.url.path
-    method = request.method
-
-    # Skip middleware for metrics endpoint to avoid content-type issues
-    if path == "/metrics":
-        return await call_next(request)
-
-    start = time.time()
-    INPROG.inc()
-    try:
-        response = await call_next(request)
-        code = response.status_code
-        return response
-    finally:
-        INPROG.dec()
-        LATENCY.labels(path=path).observe(time.time() - start)
-        REQS.labels(path=path, method=method, code=str(locals().get("code", 500))).inc()
+lifecycle = Lifecycle()
+
+@lifecycle.readiness_check("warmup")
+def warmup_done():
+    # Stand-in for warming caches or pinging dependencies
+    return (time.monotonic() - BOOT_TIME) >= READY_DELAY
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    lifecycle.install_signal_handler()
+    yield
+
+app = FastAPI(title="kube-mon-demo", lifespan=lifespan)
+app.add_middleware(PrometheusMiddleware)
 
 @app.get("/")
 def root():
@@ -43,17 +33,29 @@ def healthz():
     return {"live": True}
 
 @app.get("/readyz")
-def readyz():
-    # Readiness: only ready after READY_DELAY seconds since boot
-    ready = (time.time() - BOOT_TIME) >= READY_DELAY
-    return {"ready": ready}
+async def readyz(response: Response):
+    # Readiness: all checks pass and the app is not draining for shutdown
+    checks = await lifecycle.readiness()
+    ready = all(checks.values())
+    if not ready:
+        response.status_code = 503
+    return {"ready": ready, "checks": checks}
 
 @app.get("/metrics")
-def metrics():
-    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+def metrics(request: Request):
+    body, content_type, encoding = scrape_cache.get(request.headers.get("accept"),
+                                                    request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=content_type, headers=headers)
 
 @app.post("/crash")
-def crash():
-    """Endpoint to crash the application for testing alerts"""
-    import sys
-    sys.exit(1)
+async def crash():
+    """Endpoint to crash the application for testing alerts.
+
+    The process drains like on SIGTERM and then exits with status 1, so
+    the restart shows up without dropping other in-flight requests.
+    """
+    lifecycle.start_drain(lambda: os._exit(1))
+    return {"crashing": True}
@@ -0,0 +1,167 @@
+import gzip
+import os
+import threading
+from time import monotonic, perf_counter
+from prometheus_client import REGISTRY, Counter, Histogram, Gauge, CollectorRegistry, multiprocess
+from prometheus_client.exposition import choose_encoder
+from multiproc import MULTIPROC_DIR, scrape_lock
+
+# Prometheus metrics
+REQS = Counter("http_requests_total", "Total HTTP requests", ["path", "method", "code"])
+LATENCY = Histogram("http_request_duration_seconds", "Request latency", ["path"])
+# livesum: in multiprocess mode the gauge is summed over live workers only.
+INPROG = Gauge("http_requests_in_progress", "Requests in progress", multiprocess_mode="livesum")
+
+MAX_LABEL_SETS = int(os.getenv("METRICS_MAX_LABEL_SETS", "500"))
+UNMATCHED_PATH = "__unmatched__"   # requests that matched no route (404s, scanners)
+OVERFLOW_PATH = "__overflow__"     # anything past the label-set cap
+KNOWN_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+SCRAPE_RENDER = Histogram("metrics_scrape_render_seconds", "Time to render (and compress) the /metrics payload",
+                          ["format", "encoding"], buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5))
+SCRAPE_CACHE_SECONDS = float(os.getenv("METRICS_CACHE_SECONDS", "1"))
+SCRAPE_GZIP_LEVEL = int(os.getenv("METRICS_GZIP_LEVEL", "1"))
+
+# In-flight requests in this process, for the drain in lifecycle.py. The gauge
+# above may be shared across workers, so it is not read back.
+_in_progress = 0
+
+
+def in_progress() -> int:
+    return _in_progress
+
+
+if MULTIPROC_DIR:
+    # Metrics are written to mmap files per worker; a scrape merges all of them.
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+    _SCRAPE_REGISTRY = CollectorRegistry()
+    multiprocess.MultiProcessCollector(_SCRAPE_REGISTRY, path=MULTIPROC_DIR)
+else:
+    _SCRAPE_REGISTRY = None
+
+
+def render_latest(encoder) -> bytes:
+    """Exposition for this process, or for all workers in multiprocess mode."""
+    if _SCRAPE_REGISTRY is None:
+        return encoder(REGISTRY)
+    with scrape_lock():
+        return encoder(_SCRAPE_REGISTRY)
+
+
+def accepts_gzip(accept_encoding) -> bool:
+    """True if an Accept-Encoding header allows gzip (and does not give it q=0)."""
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            params = params.strip().lower()
+            try:
+                return not params.startswith("q=") or float(params[2:]) > 0
+            except ValueError:
+                return False
+    return False
+
+
+class ScrapeCache:
+    """Serves /metrics from a payload rendered at most once per ttl seconds.
+
+    Several Prometheus replicas scraping the same pod, or a scrape retried
+    after a timeout, reuse one rendering instead of each walking every
+    series again. Payloads are cached per exposition format (text or
+    OpenMetrics, from the Accept header), and the gzip copy is made from
+    the cached text once per window. Concurrent scrapes of a stale entry
+    wait for a single render. A ttl of 0 renders every scrape.
+    """
+
+    def __init__(self, render=render_latest, ttl: float = SCRAPE_CACHE_SECONDS, gzip_level: int = SCRAPE_GZIP_LEVEL):
+        self.render = render
+        self.ttl = ttl
+        self.gzip_level = gzip_level
+        self._lock = threading.Lock()
+        self._entries = {}  # content type -> [expires_at, body, gzipped body or None]
+
+    def get(self, accept=None, accept_encoding=None):
+        """Return (body, content_type, content_encoding or None) for a scrape."""
+        encoder, content_type = choose_encoder(accept)
+        use_gzip = accepts_gzip(accept_encoding)
+        fmt = "openmetrics" if content_type.startswith("application/openmetrics-text") else "text"
+        entry = self._entries.get(content_type)
+        if entry is None or entry[0] <= monotonic() or (use_gzip and entry[2] is None):
+            with self._lock:
+                entry = self._entries.get(content_type)
+                if entry is None or entry[0] <= monotonic():
+                    start = perf_counter()
+                    body = self.render(encoder)
+                    SCRAPE_RENDER.labels(format=fmt, encoding="identity").observe(perf_counter() - start)
+                    entry = [monotonic() + self.ttl, body, None]
+                    self._entries[content_type] = entry
+                if use_gzip and entry[2] is None:
+                    start = perf_counter()
+                    entry[2] = gzip.compress(entry[1], compresslevel=self.gzip_level)
+                    SCRAPE_RENDER.labels(format=fmt, encoding="gzip").observe(perf_counter() - start)
+        if use_gzip:
+            return entry[2], content_type, "gzip"
+        return entry[1], content_type, None
+
+
+scrape_cache = ScrapeCache()
+
+
+class PrometheusMiddleware:
+    """Plain ASGI middleware recording request count, latency and in-progress requests.
+
+    Requests are labelled with the matched route template (e.g. /items/{id})
+    rather than the raw URL, so IDs and junk paths cannot create new series.
+    Label children are resolved once per (path, method, code) and cached,
+    so the hot path is a dict lookup plus inc/observe. Past
+    METRICS_MAX_LABEL_SETS distinct combinations, new ones are recorded
+    under path="__overflow__".
+    """
+
+    def __init__(self, app, skip_paths=("/metrics",), max_label_sets: int = MAX_LABEL_SETS):
+        self.app = app
+        self.skip_paths = frozenset(skip_paths)
+        self.max_label_sets = max_label_sets
+        self._children = {}
+
+    async def __call__(self, scope, receive, send):
+        global _in_progress
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = perf_counter()
+        INPROG.inc()
+        _in_progress += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _in_progress -= 1
+            INPROG.dec()
+            elapsed = perf_counter() - start
+            # FastAPI stores the matched route in the scope during routing.
+            route = scope.get("route")
+            key = (route.path if route is not None else UNMATCHED_PATH, scope["method"], status)
+            children = self._children.get(key)
+            if children is None:
+                children = self._resolve(key)
+            children[0].inc()
+            children[1].observe(elapsed)
+
+    def _resolve(self, key):
+        path, method, status = key
+        if len(self._children) >= self.max_label_sets:
+            path = OVERFLOW_PATH
+        if method not in KNOWN_METHODS:
+            method = "OTHER"
+        children = (REQS.labels(path=path, method=method, code=str(status)), LATENCY.labels(path=path))
+        if path != OVERFLOW_PATH:
+            self._children[key] = children
+        return children
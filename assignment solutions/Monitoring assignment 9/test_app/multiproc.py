@@ -0,0 +1,103 @@
+"""Bookkeeping for prometheus_client multiprocess mode.
+
+With PROMETHEUS_MULTIPROC_DIR set, every worker writes its metrics to mmap
+files named {type}_{pid}.db and a scrape merges all of them. When a worker
+exits, its counter and histogram values must survive, but keeping its files
+would make every scrape read more files for as long as the server runs. So
+on exit the dead worker's values are added into {type}_archive.db and its
+files are removed. The directory then holds one file set per live worker plus
+one archive, whatever the worker churn.
+
+Kept free of metric definitions so the gunicorn master can import it without
+creating metric files of its own.
+"""
+import glob
+import os
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Imported up front: the master compacts from its SIGCHLD handler, which can
+# interrupt itself, and a half-finished lazy import there fails.
+from prometheus_client import multiprocess
+from prometheus_client.mmap_dict import MmapedDict
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+ARCHIVED_TYPES = ("counter", "histogram", "summary")
+
+_dead_pids = []
+_compacting = False
+
+
+@contextmanager
+def _locked(shared: bool):
+    import fcntl
+
+    with open(os.path.join(MULTIPROC_DIR, ".lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def scrape_lock():
+    """Held while collecting so a scrape never sees a half-finished compaction."""
+    return _locked(shared=True)
+
+
+def clear_multiproc_dir() -> None:
+    """Remove metric files left over from a previous run. Call before workers start."""
+    if not MULTIPROC_DIR:
+        return
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+    for path in glob.glob(os.path.join(MULTIPROC_DIR, "*.db*")):
+        os.remove(path)
+
+
+def compact_dead_process(pid: int) -> None:
+    """Fold a dead worker's metric files into the archive files.
+
+    A call made while another one is running (a signal handler interrupting
+    itself) only queues the pid; taking the lock again would deadlock.
+    """
+    global _compacting
+    if not MULTIPROC_DIR:
+        return
+    _dead_pids.append(pid)
+    while _dead_pids and not _compacting:
+        _compacting = True
+        try:
+            while _dead_pids:
+                _compact(_dead_pids.pop())
+        finally:
+            _compacting = False
+
+
+def _compact(pid: int) -> None:
+    with _locked(shared=False):
+        multiprocess.mark_process_dead(pid, MULTIPROC_DIR)
+        for typ in ARCHIVED_TYPES:
+            dead = os.path.join(MULTIPROC_DIR, f"{typ}_{pid}.db")
+            if not os.path.exists(dead):
+                continue
+            archive = os.path.join(MULTIPROC_DIR, f"{typ}_archive.db")
+
+            # Counter, histogram bucket and sum values are all plain per-process
+            # totals, so merging is a sum per key.
+            totals = defaultdict(float)
+            for path in (archive, dead):
+                if os.path.exists(path):
+                    for key, value, _, _ in MmapedDict.read_all_values_from_file(path):
+                        totals[key] += value
+
+            tmp = archive + ".tmp"
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            merged = MmapedDict(tmp)
+            try:
+                for key, value in totals.items():
+                    merged.write_value(key, value, 0.0)
+            finally:
+                merged.close()
+            os.replace(tmp, archive)
+            os.remove(dead)
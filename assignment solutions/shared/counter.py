@@ -0,0 +1,204 @@
+import atexit
+import os
+import random
+import threading
+import time
+
+import redis
+from redis.crc import REDIS_CLUSTER_HASH_SLOTS, key_slot
+
+
+def create_redis_client():
+    # Explicit, bounded pool with short timeouts so a slow Redis can't pile up requests
+    options = dict(
+        host=os.getenv("REDIS_HOST", "localhost"),
+        port=int(os.getenv("REDIS_PORT", 6379)),
+        max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", 10)),
+        socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", 0.5)),
+        socket_connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", 0.5)),
+        decode_responses=True,
+    )
+    if os.getenv("REDIS_CLUSTER", "false").lower() == "true":
+        return redis.RedisCluster(**options)
+    return redis.Redis(connection_pool=redis.ConnectionPool(**options))
+
+
+def shard_keys(key: str, shards: int) -> list:
+    """Keys for a counter split into `shards` sub-keys.
+
+    Each key carries its own hash tag, picked so the shards' cluster slots
+    are spread evenly over the slot range. Redis Cluster assigns nodes
+    contiguous slot ranges, so the shards land on different nodes. The
+    choice is deterministic, so every replica computes the same keys.
+    """
+    keys = []
+    tag = 0
+    for index in range(shards):
+        low = index * REDIS_CLUSTER_HASH_SLOTS // shards
+        high = (index + 1) * REDIS_CLUSTER_HASH_SLOTS // shards
+        while True:
+            candidate = f"{key}:{{{key}-{tag}}}"
+            tag += 1
+            if low <= key_slot(candidate.encode()) < high:
+                keys.append(candidate)
+                break
+    return keys
+
+
+class VisitCounter:
+    """Visit counter backed by Redis.
+
+    mode="exact" sends INCR on every call. mode="approximate" counts
+    locally and a background thread sends the accumulated delta with a
+    pipelined INCRBY every flush_interval seconds, or sooner once
+    flush_threshold visits are pending. In both modes, visits that can't
+    reach Redis are kept locally and flushed later, so a Redis hiccup
+    doesn't fail the page view.
+
+    With shards > 1, writes are spread over sub-keys (one per process, or a
+    random one per write) so no single key or cluster node takes every
+    increment. The total is the sum of all sub-keys plus the original key,
+    read at most every total_ttl seconds. The value returned is that total
+    plus this process's visits since it was read.
+
+    With one shard in exact mode the returned value is the exact total from
+    INCR, as before. With shards > 1, exact only means every visit is written
+    to Redis before the page returns. The value shown is still the cached
+    total above, so concurrent readers can see it lag or repeat.
+    """
+
+    def __init__(self, client, key: str = "counter", mode: str = "exact",
+                 flush_interval: float = 1.0, flush_threshold: int = 100,
+                 shards: int = 1, shard_strategy: str = "process", total_ttl: float = 1.0):
+        if mode not in ("exact", "approximate"):
+            raise ValueError("mode must be 'exact' or 'approximate'")
+        if shard_strategy not in ("process", "random"):
+            raise ValueError("shard_strategy must be 'process' or 'random'")
+        self.client = client
+        self.key = key
+        self.mode = mode
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.sharded = shards > 1
+        self.shard_strategy = shard_strategy
+        self.total_ttl = total_ttl
+        self.shard_keys = shard_keys(key, shards) if self.sharded else [key]
+        # The unsharded key still holds visits counted before sharding was enabled.
+        self._read_keys = [key] + self.shard_keys if self.sharded else [key]
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.close)
+
+    def _reset(self) -> None:
+        # Also runs in forked children (e.g. gunicorn --preload): the parent
+        # keeps its own pending visits, and threads don't survive a fork.
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending = 0          # visits not yet written to Redis
+        self._local_since = 0      # visits by this process since _known_total was read
+        self._known_total = None
+        self._total_expires = 0.0
+        self._flusher = None
+        self._closed = False
+        self._process_shard = self.shard_keys[os.getpid() % len(self.shard_keys)]
+
+    def _write_key(self) -> str:
+        if self.shard_strategy == "random":
+            return random.choice(self.shard_keys)
+        return self._process_shard
+
+    def incr(self) -> int:
+        if self.mode == "exact":
+            try:
+                value = self.client.incr(self._write_key())
+            except redis.RedisError:
+                value = None
+            if value is not None:
+                with self._lock:
+                    if self.sharded:
+                        self._local_since += 1
+                    else:
+                        self._known_total, self._local_since = value, self._pending
+                return self._current()
+
+        with self._lock:
+            self._pending += 1
+            self._local_since += 1
+            pending = self._pending
+            if self._flusher is None:
+                self._start_flusher()
+        if pending >= self.flush_threshold:
+            self._wakeup.set()
+        return self._current()
+
+    def _current(self) -> int:
+        with self._lock:
+            stale = self._known_total is None or (self.sharded and time.monotonic() >= self._total_expires)
+        if stale:
+            self._refresh_total()
+        with self._lock:
+            return (self._known_total or 0) + self._local_since
+
+    def _refresh_total(self) -> None:
+        with self._lock:
+            # Claim the refresh so concurrent callers keep using the old total.
+            self._total_expires = time.monotonic() + self.total_ttl
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key in self._read_keys:
+                pipe.get(key)
+            total = sum(int(value or 0) for value in pipe.execute())
+        except redis.RedisError:
+            with self._lock:
+                if self._known_total is None:
+                    self._known_total = 0
+            return
+        with self._lock:
+            self._known_total, self._local_since = total, self._pending
+
+    def _start_flusher(self) -> None:
+        # Caller holds self._lock.
+        self._flusher = threading.Thread(target=self._flush_loop, name="visit-counter-flush", daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Send pending visits to Redis in one pipeline round trip."""
+        with self._lock:
+            delta, self._pending = self._pending, 0
+        if not delta:
+            return
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.incrby(self._write_key(), delta)
+            value, = pipe.execute()
+        except redis.RedisError:
+            with self._lock:
+                self._pending += delta
+            return
+        if not self.sharded:
+            with self._lock:
+                self._known_total, self._local_since = value, self._pending
+
+    def close(self) -> None:
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+
+
+def create_counter() -> VisitCounter:
+    return VisitCounter(
+        create_redis_client(),
+        key=os.getenv("COUNTER_KEY", "counter"),
+        mode=os.getenv("COUNTER_MODE", "exact"),
+        flush_interval=float(os.getenv("COUNTER_FLUSH_INTERVAL", 1.0)),
+        flush_threshold=int(os.getenv("COUNTER_FLUSH_THRESHOLD", 100)),
+        shards=int(os.getenv("COUNTER_SHARDS", 1)),
+        shard_strategy=os.getenv("COUNTER_SHARD_STRATEGY", "process"),
+        total_ttl=float(os.getenv("COUNTER_TOTAL_TTL", 1.0)),
+    )
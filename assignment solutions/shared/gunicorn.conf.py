@@ -0,0 +1,64 @@
+# Production server for the Flask app: gunicorn -c gunicorn.conf.py
+#
+# Uses the same env vars as `flask run` (FLASK_RUN_HOST, FLASK_RUN_PORT,
+# FLASK_DEBUG/FLASK_ENV=development for auto-reload). Worker count follows
+# the container's CPU limit unless WEB_CONCURRENCY is set. `kill -HUP 1`
+# restarts the workers gracefully.
+import math
+import os
+
+wsgi_app = os.getenv("WSGI_APP", "app:app")
+
+
+def _cgroup_cpus():
+    """CPUs allowed by the cgroup quota (v2, then v1), or None when unlimited."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _default_workers():
+    cpus = _cgroup_cpus() or len(os.sched_getaffinity(0))
+    if cpus < 1:
+        # e.g. 100m-200m in the Deployments: more processes would only be
+        # throttled, but keep two so a restarting worker leaves one serving.
+        return 2
+    return 2 * math.ceil(cpus) + 1
+
+
+bind = f"{os.getenv('FLASK_RUN_HOST', '0.0.0.0')}:{os.getenv('FLASK_RUN_PORT', os.getenv('PORT', '5000'))}"
+workers = int(os.getenv("WEB_CONCURRENCY") or _default_workers())
+# Threads cover requests waiting on Redis/disk without another process per request.
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+reload = os.getenv("GUNICORN_RELOAD", os.getenv("FLASK_DEBUG", "")).lower() in ("1", "true") \
+    or os.getenv("FLASK_ENV") == "development"
+# Import the app once in the master and fork workers from it (faster start,
+# shared memory). The code reloader needs fresh imports, so not both.
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true" and not reload
+
+# Keep idle connections from the Service/load balancer open between requests.
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "20"))
+max_requests = int(os.getenv("MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "100"))
+# Worker heartbeat files on tmpfs; the container's /tmp may be on overlayfs.
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None